@@ -1,65 +1,183 @@
-import os
-import requests
-from PIL import Image
-from io import BytesIO
-from tqdm import tqdm
-
-def download_dataset():
-    # 1. Create a folder named dataset_source
-    output_dir = "dataset_source"
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-        print(f"Created directory: {output_dir}")
-    
-    # URL for random images
-    base_url = "https://picsum.photos/200" # 200x200 random image
-
-    print("Starting download of 100 images...")
-    
-    # 2. Downloading & Naming (Part 1: 50 JPGs)
-    # 4. Progress bar
-    with tqdm(total=100, desc="Downloading Images", unit="img") as pbar:
-        
-        # Download 50 JPGs
-        for i in range(1, 51):
-            try:
-                response = requests.get(base_url, timeout=10)
-                response.raise_for_status()
-                
-                filename = f"image_{i:02d}.jpg"
-                file_path = os.path.join(output_dir, filename)
-                
-                with open(file_path, 'wb') as f:
-                    f.write(response.content)
-                
-            except Exception as e:
-                print(f"Error downloading {filename}: {e}")
-            
-            pbar.update(1)
-
-        # Download 50 PNGs
-        # Note: Picsum returns JPG usually (or redirect), so we convert to PNG using PIL
-        for i in range(1, 51):
-            try:
-                response = requests.get(base_url, timeout=10)
-                response.raise_for_status()
-                
-                # Convert to PNG
-                image_content = BytesIO(response.content)
-                img = Image.open(image_content)
-                
-                filename = f"image_{i:02d}.png"
-                file_path = os.path.join(output_dir, filename)
-                
-                # Ensure it saves as PNG with correct headers
-                img.save(file_path, "PNG")
-                
-            except Exception as e:
-                print(f"Error downloading/converting {filename}: {e}")
-                
-            pbar.update(1)
-
-    print(f"Done! 100 images saved to /{output_dir}")
-
-if __name__ == "__main__":
-    download_dataset()
+import argparse
+import csv
+import os
+import requests
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from PIL import Image
+from io import BytesIO
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from tqdm import tqdm
+
+# Defaults
+OUTPUT_DIR = "dataset_source"
+BASE_URL = "https://picsum.photos/200"  # 200x200 random image
+JPG_COUNT = 50
+PNG_COUNT = 50
+
+# Downloads in flight at once (also the size of the HTTP connection pool)
+CONCURRENCY = 16
+
+# Downloads submitted per download thread. Jobs are handed out as others
+# finish, so an interrupted run only waits for those already submitted.
+QUEUE_DEPTH = 2
+REQUEST_TIMEOUT = 10  # seconds
+RETRIES = 3
+
+# Files already downloaded, so an interrupted run can skip them (inside the output dir)
+MANIFEST_FILE = "download_manifest.csv"
+
+def make_session(concurrency):
+    """A requests.Session that keeps up to `concurrency` connections alive and retries transient errors."""
+    session = requests.Session()
+    retry = Retry(total=RETRIES, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def fetch(session, url):
+    response = session.get(url, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response.content
+
+def save_bytes(content, file_path):
+    """Writes the file under a temporary name first, so an interrupted run never leaves half a file."""
+    tmp_path = file_path + ".part"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, file_path)
+    return len(content)
+
+def convert_to_png(content, file_path):
+    """Converts a downloaded image to PNG. Runs in a worker process, off the download threads."""
+    # Picsum returns JPG usually (or redirect), so we convert to PNG using PIL
+    img = Image.open(BytesIO(content))
+    buffer = BytesIO()
+    # Ensure it saves as PNG with correct headers
+    img.save(buffer, "PNG")
+    return save_bytes(buffer.getvalue(), file_path)
+
+def load_manifest(output_dir):
+    """Returns the filenames recorded as downloaded that are still on disk."""
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return set()
+    with open(manifest_path, newline='', encoding='utf-8') as f:
+        return {row["filename"] for row in csv.DictReader(f)
+                if os.path.exists(os.path.join(output_dir, row["filename"]))}
+
+def _run_jobs(todo, output_dir, base_url, session, downloads, conversions, depth,
+              manifest_file, new_manifest, pbar):
+    """
+    Keeps up to `depth` downloads submitted, converts the PNGs and records
+    every finished file in the manifest. Returns the number of failures.
+    """
+    manifest = csv.writer(manifest_file)
+    if new_manifest:
+        manifest.writerow(["filename", "size_bytes"])
+
+    queued = iter(todo)
+    pending = {}
+    downloading = 0
+    failed = 0
+
+    def submit_downloads():
+        nonlocal downloading
+        while downloading < depth:
+            filename = next(queued, None)
+            if filename is None:
+                return
+            pending[downloads.submit(fetch, session, base_url)] = ("download", filename)
+            downloading += 1
+
+    submit_downloads()
+    while pending:
+        finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in finished:
+            stage, filename = pending.pop(future)
+            file_path = os.path.join(output_dir, filename)
+            if stage == "download":
+                downloading -= 1
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Error {'downloading' if stage == 'download' else 'converting'} {filename}: {e}")
+                failed += 1
+                pbar.update(1)
+                continue
+
+            if stage == "download" and filename.endswith(".png"):
+                pending[conversions.submit(convert_to_png, result, file_path)] = ("convert", filename)
+                continue
+
+            size = save_bytes(result, file_path) if stage == "download" else result
+            manifest.writerow([filename, size])
+            manifest_file.flush()
+            pbar.update(1)
+        submit_downloads()
+    return failed
+
+def download_dataset(output_dir=OUTPUT_DIR, jpg_count=JPG_COUNT, png_count=PNG_COUNT,
+                     base_url=BASE_URL, concurrency=CONCURRENCY, convert_workers=None):
+    """
+    Downloads jpg_count JPGs and png_count PNGs (converted from the JPGs the
+    service returns) into output_dir.
+
+    Downloads share one pooled HTTP session and run `concurrency` at a time,
+    PNG conversion runs in a pool of `convert_workers` processes (default: CPU
+    count). Every finished file is appended to the manifest, so running again
+    after an interruption only fetches what is missing. base_url can point at
+    any server returning an image per GET, e.g. a local stand-in for offline tests.
+    """
+    # 1. Create the output folder
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+        print(f"Created directory: {output_dir}")
+
+    # 2. Naming: image_01.jpg ... and image_01.png ..., wider numbers for large corpora
+    jobs = []
+    for extension, count in (("jpg", jpg_count), ("png", png_count)):
+        width = max(2, len(str(count)))
+        jobs.extend(f"image_{i:0{width}d}.{extension}" for i in range(1, count + 1))
+
+    done = load_manifest(output_dir)
+    todo = [filename for filename in jobs if filename not in done]
+    if done:
+        print(f"Skipping {len(jobs) - len(todo)} images already in the manifest.")
+
+    print(f"Starting download of {len(todo)} images from {base_url}...")
+
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    new_manifest = not os.path.exists(manifest_path)
+
+    # 3. Download with a thread pool, convert with a process pool
+    session = make_session(concurrency)
+    downloads = ThreadPoolExecutor(max_workers=concurrency)
+    conversions = ProcessPoolExecutor(max_workers=convert_workers)
+    try:
+        with open(manifest_path, 'a', newline='', encoding='utf-8') as manifest_file, \
+             tqdm(total=len(todo), desc="Downloading Images", unit="img") as pbar:  # 4. Progress bar
+            failed = _run_jobs(todo, output_dir, base_url, session, downloads, conversions,
+                               concurrency * QUEUE_DEPTH, manifest_file, new_manifest, pbar)
+    finally:
+        # On Ctrl-C, drop the jobs not started yet instead of running them all first
+        downloads.shutdown(cancel_futures=True)
+        conversions.shutdown(cancel_futures=True)
+
+    print(f"Done! {len(todo) - failed} images saved to /{output_dir}")
+    if failed:
+        print(f"{failed} images failed, run again to retry them.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download the JPG/PNG test images.")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="Folder for the downloaded images")
+    parser.add_argument("--jpg", type=int, default=JPG_COUNT, help="Number of JPG images")
+    parser.add_argument("--png", type=int, default=PNG_COUNT, help="Number of PNG images")
+    parser.add_argument("--base-url", default=BASE_URL,
+                        help="URL returning one image per request, e.g. a local HTTP server for offline runs")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="Downloads in flight at once")
+    parser.add_argument("--convert-workers", type=int, help="Processes converting PNGs (default: CPU count)")
+    args = parser.parse_args()
+
+    download_dataset(args.output, args.jpg, args.png, args.base_url, args.concurrency, args.convert_workers)
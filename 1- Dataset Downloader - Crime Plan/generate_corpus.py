@@ -0,0 +1,297 @@
+import argparse
+import csv
+import hashlib
+import math
+import os
+import random
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import BytesIO
+from PIL import Image, ImageDraw
+from tqdm import tqdm
+
+# Defaults (same folder and names as download_dataset, so the disk generator picks them up)
+OUTPUT_DIR = "dataset_source"
+JPG_COUNT = 50
+PNG_COUNT = 50
+MIN_SIZE = "16K"
+MAX_SIZE = "4M"
+QUALITY = "60-95"
+PROGRESSIVE_RATIO = 0.3    # share of JPEGs saved as progressive
+THUMBNAIL_RATIO = 0.3      # share of JPEGs with an EXIF thumbnail
+PNG_LAYOUTS = ["default", "split", "text"]
+
+# Corpus description, one row per file
+MANIFEST_FILE = "corpus_manifest.csv"
+MANIFEST_FIELDS = ["filename", "size_bytes", "target_bytes", "width", "height", "quality",
+                   "progressive", "thumbnail", "png_layout", "md5_hash"]
+
+# Suffixes accepted by --min-size / --max-size
+SIZE_UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+# Rough encoded bytes per pixel, only used for the first guess of the dimensions
+BYTES_PER_PIXEL = {"jpg": 0.8, "png": 2.0}
+MIN_SIDE = 16
+MAX_SIDE = 16000
+# Largest image drawn (about 120MB per RGB layer), big targets end up somewhat smaller
+MAX_PIXELS = 40 * 1000 * 1000
+# Noise bytes generated and blended at once, in bands of whole rows
+NOISE_BAND_BYTES = 16 * 1024 * 1024  # 16MB
+# Largest image encoded to measure the real bytes per pixel
+CALIBRATION_PIXELS = 512 * 512
+
+# EXIF thumbnails are stored in one APP1 segment, so they stay well under 64KB
+THUMBNAIL_BOX = (160, 120)
+
+# IDAT payload per chunk for the "split" PNG layout, picked per file
+IDAT_SIZES = [1024, 8192, 65536, 262144]
+
+def parse_size(text):
+    """Parses a size like '16K', '32M' or '4096' into bytes."""
+    text = text.strip().upper().rstrip("B")
+    if text and text[-1] in SIZE_UNITS:
+        return int(float(text[:-1]) * SIZE_UNITS[text[-1]])
+    return int(text)
+
+def parse_range(text):
+    """Parses '80' or '60-95' into (low, high)."""
+    low, _, high = text.partition("-")
+    return int(low), int(high or low)
+
+def draw_image(rng, width, height, noise):
+    """
+    Paints a gradient, a few shapes and a layer of seeded noise. The noise
+    share controls how well the image compresses, and so the file size.
+    """
+    colors = [tuple(rng.randrange(256) for _ in range(3)) for _ in range(2)]
+    gradient = Image.linear_gradient("L").resize((width, height))
+    img = Image.composite(Image.new("RGB", (width, height), colors[0]),
+                          Image.new("RGB", (width, height), colors[1]), gradient)
+
+    draw = ImageDraw.Draw(img)
+    for _ in range(rng.randint(3, 20)):
+        x0, x1 = sorted(rng.randrange(width) for _ in range(2))
+        y0, y1 = sorted(rng.randrange(height) for _ in range(2))
+        fill = tuple(rng.randrange(256) for _ in range(3))
+        if rng.random() < 0.5:
+            draw.rectangle((x0, y0, x1, y1), fill=fill)
+        else:
+            draw.ellipse((x0, y0, x1, y1), fill=fill)
+
+    # randbytes is seeded (unlike Image.effect_noise), so the corpus is reproducible
+    rows_per_band = max(1, NOISE_BAND_BYTES // (width * 3))
+    for top in range(0, height, rows_per_band):
+        box = (0, top, width, min(height, top + rows_per_band))
+        band = img.crop(box)
+        noise_layer = Image.frombytes("RGB", band.size, rng.randbytes(band.width * band.height * 3))
+        img.paste(Image.blend(band, noise_layer, noise), box)
+    return img
+
+def exif_thumbnail_segment(thumbnail):
+    """
+    Builds an APP1 segment with a minimal little-endian EXIF block whose IFD1
+    points at `thumbnail` (JPEG bytes), the way cameras store previews.
+    """
+    # TIFF header, empty IFD0 linking to IFD1, IFD1 with three entries
+    ifd1_offset = 8 + 2 + 4
+    data_offset = ifd1_offset + 2 + 3 * 12 + 4
+    tiff = b"II*\x00" + struct.pack("<I", 8)
+    tiff += struct.pack("<HI", 0, ifd1_offset)
+    tiff += struct.pack("<H", 3)
+    tiff += struct.pack("<HHII", 0x0103, 3, 1, 6)                 # Compression: JPEG
+    tiff += struct.pack("<HHII", 0x0201, 4, 1, data_offset)       # JPEGInterchangeFormat
+    tiff += struct.pack("<HHII", 0x0202, 4, 1, len(thumbnail))    # JPEGInterchangeFormatLength
+    tiff += struct.pack("<I", 0)
+    payload = b"Exif\x00\x00" + tiff + thumbnail
+    return b"\xFF\xE1" + struct.pack(">H", len(payload) + 2) + payload
+
+def _png_chunk(chunk_type, data):
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+def relayout_png(data, layout, rng):
+    """
+    Rewrites the chunk layout of a PNG: "split" re-cuts the image data into
+    IDAT chunks of a random size, "text" adds tEXt/zTXt/tIME chunks around
+    it. "default" keeps Pillow's layout.
+    """
+    if layout == "default":
+        return data
+    chunks = []
+    pos = 8
+    while pos < len(data):
+        length, chunk_type = struct.unpack(">I4s", data[pos:pos + 8])
+        chunks.append((chunk_type, data[pos + 8:pos + 8 + length]))
+        pos += 12 + length
+
+    ihdr = [c for c in chunks if c[0] == b"IHDR"]
+    idat = b"".join(d for t, d in chunks if t == b"IDAT")
+    other = [c for c in chunks if c[0] not in (b"IHDR", b"IDAT", b"IEND")]
+
+    before, after = list(other), []
+    if layout == "text":
+        before.append((b"tEXt", b"Software\x00generate_corpus"))
+        before.append((b"zTXt", b"Comment\x00\x00" + zlib.compress(b"synthetic test image " * 8)))
+        before.append((b"tIME", struct.pack(">HBBBBB", 2000 + rng.randrange(30), rng.randint(1, 12),
+                                            rng.randint(1, 28), rng.randrange(24), rng.randrange(60),
+                                            rng.randrange(60))))
+        after.append((b"tEXt", b"Title\x00trailing text chunk"))
+
+    idat_size = rng.choice(IDAT_SIZES) if layout == "split" else max(len(idat), 1)
+    out = [data[:8]] + [_png_chunk(t, d) for t, d in ihdr + before]
+    out += [_png_chunk(b"IDAT", idat[i:i + idat_size]) for i in range(0, len(idat), idat_size)]
+    out += [_png_chunk(t, d) for t, d in after] + [_png_chunk(b"IEND", b"")]
+    return b"".join(out)
+
+def encode(img, spec, rng):
+    """Encodes the image as the spec asks and returns the file bytes."""
+    buffer = BytesIO()
+    if spec["format"] == "jpg":
+        img.save(buffer, "JPEG", quality=spec["quality"], progressive=spec["progressive"])
+        data = buffer.getvalue()
+        if spec["thumbnail"]:
+            thumbnail = img.copy()
+            thumbnail.thumbnail(THUMBNAIL_BOX)
+            thumb_buffer = BytesIO()
+            thumbnail.save(thumb_buffer, "JPEG", quality=75)
+            # Right after the SOI, where cameras put their EXIF block
+            data = data[:2] + exif_thumbnail_segment(thumb_buffer.getvalue()) + data[2:]
+        return data
+    img.save(buffer, "PNG", compress_level=6)
+    return relayout_png(buffer.getvalue(), spec["png_layout"], rng)
+
+def _dimensions(pixels, aspect):
+    pixels = min(pixels, MAX_PIXELS)
+    width = int(min(MAX_SIDE, max(MIN_SIDE, math.sqrt(pixels * aspect))))
+    height = int(min(MAX_SIDE, max(MIN_SIDE, pixels / width)))
+    return width, height
+
+def make_file(spec):
+    """
+    Generates one corpus file from its spec (run in a worker process).
+    A first, smaller encode measures the bytes per pixel, the real image is
+    then sized to land near the target size.
+    """
+    rng = random.Random(spec["seed"])
+    aspect = rng.choice([1.0, 4 / 3, 3 / 2, 16 / 9, 3 / 4, 2 / 3])
+    noise = rng.uniform(0.05, 0.6)
+    calibration_seed = rng.getrandbits(64)
+    image_seed = rng.getrandbits(64)
+
+    # Calibrate on a smaller version of the image, big targets would otherwise be drawn twice
+    pixels = spec["target_bytes"] / BYTES_PER_PIXEL[spec["format"]]
+    width, height = _dimensions(min(pixels, CALIBRATION_PIXELS), aspect)
+    # Without the thumbnail, its fixed size would skew the small probe
+    probe = encode(draw_image(random.Random(calibration_seed), width, height, noise),
+                   dict(spec, thumbnail=False), random.Random(calibration_seed))
+    bytes_per_pixel = len(probe) / (width * height)
+    width, height = _dimensions(spec["target_bytes"] / bytes_per_pixel, aspect)
+
+    data = encode(draw_image(random.Random(image_seed), width, height, noise), spec, random.Random(image_seed))
+    with open(os.path.join(spec["output_dir"], spec["filename"]), "wb") as f:
+        f.write(data)
+    return {
+        "filename": spec["filename"], "size_bytes": len(data), "target_bytes": spec["target_bytes"],
+        "width": width, "height": height, "quality": spec["quality"], "progressive": spec["progressive"],
+        "thumbnail": spec["thumbnail"], "png_layout": spec["png_layout"],
+        "md5_hash": hashlib.md5(data).hexdigest(),
+    }
+
+def plan_corpus(output_dir, jpg_count, png_count, min_size, max_size, quality, progressive_ratio,
+                thumbnail_ratio, png_layouts, seed):
+    """
+    Draws every file's spec up front from one seeded RNG, so the corpus does
+    not depend on how the work is spread over processes. Target sizes are
+    log-uniform between min_size and max_size, covering every order of magnitude.
+    """
+    rng = random.Random(seed)
+    specs = []
+    for extension, count in (("jpg", jpg_count), ("png", png_count)):
+        width = max(2, len(str(count)))
+        for i in range(1, count + 1):
+            target = int(math.exp(rng.uniform(math.log(min_size), math.log(max_size))))
+            is_jpg = extension == "jpg"
+            specs.append({
+                "filename": f"image_{i:0{width}d}.{extension}",
+                "output_dir": output_dir,
+                "format": extension,
+                "target_bytes": target,
+                "quality": rng.randint(*quality) if is_jpg else "",
+                "progressive": is_jpg and rng.random() < progressive_ratio,
+                "thumbnail": is_jpg and rng.random() < thumbnail_ratio,
+                "png_layout": "" if is_jpg else rng.choice(png_layouts),
+                "seed": rng.getrandbits(64),
+            })
+    return specs
+
+def generate_corpus(output_dir=OUTPUT_DIR, jpg_count=JPG_COUNT, png_count=PNG_COUNT,
+                    min_size=MIN_SIZE, max_size=MAX_SIZE, quality=QUALITY,
+                    progressive_ratio=PROGRESSIVE_RATIO, thumbnail_ratio=THUMBNAIL_RATIO,
+                    png_layouts=PNG_LAYOUTS, seed=0, workers=None):
+    """
+    Builds a synthetic JPG/PNG corpus locally, an offline alternative to
+    download_dataset. The same seed and options give the same files (with the
+    same Pillow version), so air-gapped machines can rebuild a corpus exactly.
+    Files are generated in a pool of `workers` processes (default: CPU count).
+    A file that fails is reported and left out of the manifest, the others are kept.
+    """
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+        print(f"Created directory: {output_dir}")
+
+    specs = plan_corpus(output_dir, jpg_count, png_count, parse_size(min_size), parse_size(max_size),
+                        parse_range(quality), progressive_ratio, thumbnail_ratio, png_layouts, seed)
+
+    print(f"Generating {len(specs)} images ({min_size} to {max_size}, seed {seed})...")
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    total_bytes = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool, \
+         open(manifest_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=MANIFEST_FIELDS)
+        writer.writeheader()
+        # Largest files first, so one big file does not finish last on a single core
+        order = sorted(specs, key=lambda spec: spec["target_bytes"], reverse=True)
+        futures = {pool.submit(make_file, spec): spec for spec in order}
+        rows = {}
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Generating Images", unit="img"):
+            try:
+                row = future.result()
+            except Exception as e:
+                tqdm.write(f"Error generating {futures[future]['filename']}: {e}")
+                continue
+            rows[row["filename"]] = row
+            total_bytes += row["size_bytes"]
+        for spec in specs:
+            if spec["filename"] in rows:
+                writer.writerow(rows[spec["filename"]])
+
+    print(f"Done! {len(rows)} images ({total_bytes / (1024 * 1024):.1f} MB) saved to /{output_dir}")
+    if len(rows) < len(specs):
+        print(f"{len(specs) - len(rows)} images failed, see the errors above.")
+    print(f"Manifest saved to {manifest_path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic JPG/PNG corpus without network access.")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="Folder for the generated images")
+    parser.add_argument("--jpg", type=int, default=JPG_COUNT, help="Number of JPG images")
+    parser.add_argument("--png", type=int, default=PNG_COUNT, help="Number of PNG images")
+    parser.add_argument("--min-size", default=MIN_SIZE, help="Smallest target file size, e.g. 8K")
+    parser.add_argument("--max-size", default=MAX_SIZE, help="Largest target file size, e.g. 32M")
+    parser.add_argument("--quality", default=QUALITY, help="JPEG quality or range, e.g. 85 or 60-95")
+    parser.add_argument("--progressive-ratio", type=float, default=PROGRESSIVE_RATIO,
+                        help="Share of JPEGs saved as progressive")
+    parser.add_argument("--thumbnail-ratio", type=float, default=THUMBNAIL_RATIO,
+                        help="Share of JPEGs with an embedded EXIF thumbnail")
+    parser.add_argument("--png-layouts", default=",".join(PNG_LAYOUTS),
+                        help=f"Comma separated PNG chunk layouts to mix ({', '.join(PNG_LAYOUTS)})")
+    parser.add_argument("--seed", type=int, default=0, help="Seed, the same seed rebuilds the same corpus")
+    parser.add_argument("--workers", type=int, help="Processes generating images (default: CPU count)")
+    args = parser.parse_args()
+
+    layouts = args.png_layouts.split(",")
+    unknown = [layout for layout in layouts if layout not in PNG_LAYOUTS]
+    if unknown:
+        parser.error(f"Unknown PNG layout(s): {', '.join(unknown)}")
+
+    generate_corpus(args.output, args.jpg, args.png, args.min_size, args.max_size, args.quality,
+                    args.progressive_ratio, args.thumbnail_ratio, layouts, args.seed, args.workers)
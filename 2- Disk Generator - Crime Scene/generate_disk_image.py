@@ -1,165 +1,462 @@
-import os
-import random
-import hashlib
-import csv
-import struct
-from tqdm import tqdm
-
-# Configuration
-DATASET_SOURCE = "dataset_source"
-OUTPUT_IMAGE = "test_disk.img"
-OUTPUT_CSV = "ground_truth.csv"
-DISK_SIZE = 100 * 1024 * 1024  # 100 MB
-
-def calculate_md5(file_path):
-    """Calculates the MD5 hash of a file."""
-    hash_md5 = hashlib.md5()
-    with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_md5.update(chunk)
-    return hash_md5.hexdigest()
-
-def get_valid_images(source_folder):
-    """Scans the folder for JPG and PNG files."""
-    valid_images = []
-    if not os.path.exists(source_folder):
-        print(f"[-] Error: Source folder '{source_folder}' does not exist.")
-        return []
-
-    print(f"[*] Scanning {source_folder} for images...")
-    for filename in os.listdir(source_folder):
-        if filename.lower().endswith(('.jpg', '.jpeg', '.png')):
-            file_path = os.path.join(source_folder, filename)
-            file_size = os.path.getsize(file_path)
-            
-            print(f"[-] Hashing file: {filename}...")
-            file_hash = calculate_md5(file_path)
-            
-            valid_images.append({
-                "filename": filename,
-                "path": file_path,
-                "size": file_size,
-                "md5": file_hash
-            })
-    
-    return valid_images
-
-def generate_noise(size):
-    """Generates random byte noise."""
-    return os.urandom(size)
-
-def generate_disk():
-    """Generates the synthetic disk image."""
-    images = get_valid_images(DATASET_SOURCE)
-    
-    if not images:
-        print("[-] No valid images found. Exiting.")
-        return
-
-    print(f"[*] Initializing {DISK_SIZE/1024/1024:.2f} MB disk buffer...")
-    # Initialize disk with zeros (or could be noise, prompt said 'zeros or random noise', 
-    # but later said 'Fill the remaining empty spaces... with random byte garbage')
-    # Use bytearray for mutability
-    disk_data = bytearray(DISK_SIZE)
-    
-    # Keep track of occupied ranges to avoid overlap
-    occupied_ranges = []
-    injected_images = []
-
-    print("[*] Injecting images...")
-    for img in tqdm(images, desc="Disk Generation"):
-        file_size = img['size']
-        if file_size > DISK_SIZE:
-             print(f"[!] Skipping {img['filename']}: Larger than disk size.")
-             continue
-
-        # Try to find a valid spot
-        attempts = 0
-        max_attempts = 100
-        placed = False
-        
-        while attempts < max_attempts:
-            start_offset = random.randint(0, DISK_SIZE - file_size)
-            end_offset = start_offset + file_size
-            
-            overlap = False
-            for start, end in occupied_ranges:
-                if not (end_offset <= start or start_offset >= end):
-                    overlap = True
-                    break
-            
-            if not overlap:
-                # Write image data
-                with open(img['path'], 'rb') as f:
-                    img_data = f.read()
-                    disk_data[start_offset:end_offset] = img_data
-                
-                occupied_ranges.append((start_offset, end_offset))
-                img['offset'] = start_offset
-                injected_images.append(img)
-                tqdm.write(f"[+] Successfully injected {img['filename']} at offset {start_offset}")
-                placed = True
-                break
-            
-            attempts += 1
-        
-        if not placed:
-             tqdm.write(f"[-] Could not find space for {img['filename']} after {max_attempts} attempts.")
-
-    print("[*] Filling remaining space with noise...")
-    # This might be slow for 100MB if we iterate byte by byte. 
-    # Better approach: generate chunks of noise for empty regions.
-    # However, the prompt says "Fill the remaining empty spaces (zeros) with random byte garbage"
-    # To do this efficiently, we can just fill the whole array with noise first? 
-    # No, prompt said: "Create a 100MB empty byte array... Injection... Noise Filling: Fill the remaining empty spaces"
-    
-    # We need to fill the zeros. 
-    # Since we initialized with 0s, we can iterate and fill.
-    # To optimize, we can sort occupied ranges and fill gaps.
-    
-    occupied_ranges.sort()
-    current_pos = 0
-    
-    # Fill gaps before, between, and after images
-    for start, end in occupied_ranges:
-        if start > current_pos:
-            gap_size = start - current_pos
-            # Generate noise in chunks to avoid memory spike if possible, or just direct assignment
-            disk_data[current_pos:start] = os.urandom(gap_size)
-        current_pos = end
-        
-    if current_pos < DISK_SIZE:
-        disk_data[current_pos:] = os.urandom(DISK_SIZE - current_pos)
-
-    print(f"[*] Writing disk image to {OUTPUT_IMAGE}...")
-    with open(OUTPUT_IMAGE, "wb") as f:
-        f.write(disk_data)
-
-    print(f"[*] Writing ground truth CSV to {OUTPUT_CSV}...")
-    with open(OUTPUT_CSV, "w", newline="") as csvfile:
-        fieldnames = ["filename", "md5_hash", "start_offset_decimal", "file_size_bytes"]
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        for img in injected_images:
-            writer.writerow({
-                "filename": img['filename'],
-                "md5_hash": img['md5'],
-                "start_offset_decimal": img['offset'],
-                "file_size_bytes": img['size']
-            })
-
-    # Summary
-    total_files = len(injected_images)
-    total_data_size = sum(img['size'] for img in injected_images) / (1024 * 1024)
-    disk_utilization = (sum(img['size'] for img in injected_images) / DISK_SIZE) * 100
-    
-    print("\n" + "="*30)
-    print("SUMMARY")
-    print("="*30)
-    print(f"Total Files: {total_files}")
-    print(f"Total Data Size: {total_data_size:.2f} MB")
-    print(f"Disk Utilization: {disk_utilization:.2f}%")
-    print("="*30)
-
-if __name__ == "__main__":
-    generate_disk()
+import argparse
+import os
+import random
+import hashlib
+import csv
+from tqdm import tqdm
+
+from seekable_zstd import SeekableZstdWriter
+from scenarios import (DEFAULT_SCENARIO, MAX_THUMBNAIL_SIZE, EXIF_INSERT_POS, is_jpeg, pick_scenario,
+                       split_fragments, truncated_size, exif_segment)
+
+try:
+    import numpy as np
+except ImportError:  # noise falls back to random.Random.randbytes (slower)
+    np = None
+
+# Configuration
+DATASET_SOURCE = "dataset_source"
+OUTPUT_IMAGE = "test_disk.img"
+OUTPUT_CSV = "ground_truth.csv"
+OUTPUT_EXTENDED_CSV = "ground_truth_extended.csv"
+DISK_SIZE = 100 * 1024 * 1024  # 100 MB
+WRITE_CHUNK_SIZE = 16 * 1024 * 1024  # 16 MB, largest buffer held while writing
+
+# Noise profiles for the space between files:
+#   random    - uniform random bytes
+#   zeros     - never-written space, left as holes in a sparse file
+#   realistic - random bytes with zeroed blocks and planted signature fragments
+NOISE_PROFILES = ["random", "zeros", "realistic"]
+
+# "realistic" profile tuning
+REALISTIC_BLOCK = 4096           # blocks that may be zeroed as a whole
+REALISTIC_ZERO_FRACTION = 0.3    # share of blocks that are zero-filled
+REALISTIC_PLANT_INTERVAL = 65536 # one signature fragment per this many bytes on average
+# Header/footer lookalikes planted into noise (realistic profile, --false-signatures):
+# JPEG SOI/EOI, PNG signature, IEND
+REALISTIC_FRAGMENTS = [b'\xFF\xD8', b'\xFF\xD9', b'\xFF\xD8\xFF\xE0',
+                       b'\x89\x50\x4E\x47\x0D\x0A\x1A\x0A', b'IEND']
+
+# One row per written piece: fragments, truncated parts, embedded thumbnails
+EXTENDED_FIELDS = ["filename", "md5_hash", "scenario", "piece_index", "piece_count",
+                   "start_offset_decimal", "file_offset_decimal", "piece_size_bytes",
+                   "file_size_bytes", "parent"]
+
+# Output formats: a raw image, or seekable zstd frames the carver can read in place
+COMPRESSIONS = ["none", "zstd"]
+
+# Suffixes accepted by --size
+SIZE_UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+def parse_size(text):
+    """Parses a size like '500G', '100M' or '4096' into bytes."""
+    text = text.strip().upper().rstrip("B")
+    if text and text[-1] in SIZE_UNITS:
+        return int(float(text[:-1]) * SIZE_UNITS[text[-1]])
+    return int(text)
+
+def calculate_md5(file_path):
+    """Calculates the MD5 hash of a file."""
+    hash_md5 = hashlib.md5()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(4096), b""):
+            hash_md5.update(chunk)
+    return hash_md5.hexdigest()
+
+def get_valid_images(source_folder):
+    """Scans the folder for JPG and PNG files."""
+    valid_images = []
+    if not os.path.exists(source_folder):
+        print(f"[-] Error: Source folder '{source_folder}' does not exist.")
+        return []
+
+    print(f"[*] Scanning {source_folder} for images...")
+    # Sorted so the same seed always places the same files at the same offsets
+    for filename in sorted(os.listdir(source_folder)):
+        if filename.lower().endswith(('.jpg', '.jpeg', '.png')):
+            file_path = os.path.join(source_folder, filename)
+            file_size = os.path.getsize(file_path)
+            
+            print(f"[-] Hashing file: {filename}...")
+            file_hash = calculate_md5(file_path)
+            
+            valid_images.append({
+                "filename": filename,
+                "path": file_path,
+                "size": file_size,
+                "md5": file_hash
+            })
+    
+    return valid_images
+
+class NoiseSource:
+    """
+    Seeded, reproducible noise for the gaps between files.
+
+    Bytes come from a NumPy PCG64 generator filled in bulk (random.Random
+    without NumPy), so the same seed always produces the same image.
+    false_signatures_per_mb plants JPEG/PNG header and footer lookalikes
+    into the noise to stress carvers.
+    """
+
+    def __init__(self, profile="random", seed=None, false_signatures_per_mb=None):
+        if profile not in NOISE_PROFILES:
+            raise ValueError(f"Unknown noise profile {profile}, expected one of {NOISE_PROFILES}")
+        self.profile = profile
+        # Planted header/footer lookalikes, "realistic" plants some by default
+        if false_signatures_per_mb is None:
+            false_signatures_per_mb = (1024 * 1024 / REALISTIC_PLANT_INTERVAL) if profile == "realistic" else 0
+        self.false_signatures_per_mb = false_signatures_per_mb
+        if np is not None:
+            self.generator = np.random.Generator(np.random.PCG64(seed))
+        else:
+            self.generator = random.Random(seed)
+
+    def random_bytes(self, size):
+        """Returns `size` uniformly random bytes."""
+        if np is None:
+            return self.generator.randbytes(size)
+        words = self.generator.integers(0, 2**64 - 1, size=(size + 7) // 8, dtype=np.uint64, endpoint=True)
+        return words.view(np.uint8)[:size].tobytes()
+
+    def generate(self, size):
+        """Generates `size` bytes of noise for this profile."""
+        if self.profile == "random" and not self.false_signatures_per_mb:
+            return self.random_bytes(size)
+        if self.profile == "zeros":
+            data = bytearray(size)
+        else:
+            data = bytearray(self.random_bytes(size))
+        rng = random.Random(self.random_bytes(8))
+        if self.profile == "realistic":
+            self._zero_blocks(data, rng)
+        if self.false_signatures_per_mb:
+            self._plant(data, rng)
+        return bytes(data)
+
+    def _zero_blocks(self, data, rng):
+        """Zeroes a share of whole blocks, like never-written disk space."""
+        size = len(data)
+        zero = bytes(REALISTIC_BLOCK)
+        for block_start in range(0, size, REALISTIC_BLOCK):
+            if rng.random() < REALISTIC_ZERO_FRACTION:
+                block_end = min(block_start + REALISTIC_BLOCK, size)
+                data[block_start:block_end] = zero[:block_end - block_start]
+
+    def _plant(self, data, rng):
+        """Plants header/footer lookalikes at the configured density."""
+        size = len(data)
+        expected = size * self.false_signatures_per_mb / (1024 * 1024)
+        # Whole expected count, plus one more with the probability of the remainder
+        count = int(expected) + (rng.random() < expected - int(expected))
+        for _ in range(count):
+            fragment = rng.choice(REALISTIC_FRAGMENTS)
+            if size > len(fragment):
+                pos = rng.randrange(size - len(fragment))
+                data[pos:pos + len(fragment)] = fragment
+
+    def write(self, out, size):
+        """Writes `size` bytes of noise in bounded chunks. Zeros are skipped over, leaving a hole."""
+        if self.profile == "zeros" and not self.false_signatures_per_mb:
+            out.seek(size, os.SEEK_CUR)
+            return
+        while size > 0:
+            chunk = min(size, WRITE_CHUNK_SIZE)
+            out.write(self.generate(chunk))
+            size -= chunk
+
+def layout(pieces, disk_size, rng):
+    """
+    Gives every piece a disk offset and returns the pieces in disk order.
+
+    The pieces are shuffled and placed front to back, with noise gaps cut
+    from the free space at sorted random points, so laying out n pieces is
+    O(n log n). Pieces with an 'align' start on a multiple of it (cluster
+    aligned fragments); their worst case padding is kept out of the gaps.
+    """
+    order = list(pieces)
+    rng.shuffle(order)
+    free = disk_size - reserved_size(order)
+    cuts = sorted(rng.randint(0, free) for _ in order)
+    pos = previous = 0
+    for piece, cut in zip(order, cuts):
+        pos += cut - previous
+        previous = cut
+        align = piece.get('align', 1)
+        pos = -(-pos // align) * align
+        piece['offset'] = pos
+        pos += piece['size']
+    return order
+
+def reserved_size(pieces):
+    """Disk space the pieces need, including the worst case alignment padding."""
+    return sum(piece['size'] + piece.get('align', 1) - 1 for piece in pieces)
+
+def copy_piece(piece, out):
+    """
+    Writes one planned piece: a byte range of a source file, with the EXIF
+    segment of an embedded thumbnail inserted if the piece has one.
+    """
+    with open(piece['path'], 'rb') as src:
+        src.seek(piece['file_offset'])
+        remaining = piece['size']
+        if 'thumbnail' in piece:
+            with open(piece['thumbnail'], 'rb') as f:
+                segment, _ = exif_segment(f.read())
+            out.write(src.read(piece['insert_pos']))
+            out.write(segment)
+            remaining -= piece['insert_pos'] + len(segment)
+        while remaining > 0:
+            chunk = src.read(min(remaining, WRITE_CHUNK_SIZE))
+            if not chunk:
+                break
+            out.write(chunk)
+            remaining -= len(chunk)
+
+def plan_image(img, kind, options, rng, thumbnails):
+    """
+    Plans the pieces of one source file placed as `kind` (see scenarios.pick_scenario).
+
+    Returns a plan dict with the pieces to write: dicts with the size, the
+    source path and file offset, and for an embedded thumbnail its path and
+    insert position. layout() gives them their offsets, plan_rows() then
+    makes the ground truth rows.
+    """
+    size = img['size']
+
+    if kind == "fragmented":
+        fragments = split_fragments(size, options["fragments"], options["cluster_size"], rng)
+        pieces = [{"size": length, "path": img['path'], "file_offset": file_offset,
+                   "align": options["cluster_size"]}
+                  for file_offset, length in fragments]
+        return {"img": img, "kind": kind, "pieces": pieces}
+
+    if kind == "embedded":
+        # Any thumbnail but img itself, drawn without building a list per file
+        thumb = thumbnails[rng.randrange(len(thumbnails))]
+        while thumb is img:
+            thumb = thumbnails[rng.randrange(len(thumbnails))]
+        with open(thumb['path'], 'rb') as f:
+            segment, thumb_pos = exif_segment(f.read())
+        # Only the hash of the composed JPEG is kept, copy_piece() builds it again while writing
+        hash_md5 = hashlib.md5()
+        with open(img['path'], 'rb') as f:
+            hash_md5.update(f.read(EXIF_INSERT_POS))
+            hash_md5.update(segment)
+            for chunk in iter(lambda: f.read(WRITE_CHUNK_SIZE), b""):
+                hash_md5.update(chunk)
+        composed = {**img, 'size': size + len(segment), 'md5': hash_md5.hexdigest()}
+        piece = {"size": composed['size'], "path": img['path'], "file_offset": 0,
+                 "thumbnail": thumb['path'], "insert_pos": EXIF_INSERT_POS}
+        return {"img": composed, "kind": kind, "pieces": [piece],
+                "thumbnail": thumb, "thumb_pos": EXIF_INSERT_POS + thumb_pos}
+
+    # contiguous or truncated: one piece from the start of the file
+    written = truncated_size(size, rng) if kind == "truncated" else size
+    return {"img": img, "kind": kind, "pieces": [{"size": written, "path": img['path'], "file_offset": 0}]}
+
+def plan_rows(plan):
+    """
+    Returns (ground truth rows, extended rows) of a laid out plan. Ground truth
+    rows are the image dicts with their offset (a fragmented file's first fragment).
+    """
+    img, kind, pieces = plan['img'], plan['kind'], plan['pieces']
+
+    def extended(row_img, scenario, index, count, offset, file_offset, piece_size, parent=""):
+        return {
+            "filename": row_img['filename'], "md5_hash": row_img['md5'], "scenario": scenario,
+            "piece_index": index, "piece_count": count, "start_offset_decimal": offset,
+            "file_offset_decimal": file_offset, "piece_size_bytes": piece_size,
+            "file_size_bytes": row_img['size'], "parent": parent,
+        }
+
+    offset = pieces[0]['offset']
+    if kind == "embedded":
+        thumb = plan['thumbnail']
+        nested = {**thumb, 'offset': offset + plan['thumb_pos']}
+        extended_rows = [
+            extended(img, kind, 0, 1, offset, 0, img['size']),
+            extended(thumb, "thumbnail", 0, 1, nested['offset'], 0, thumb['size'], parent=img['filename']),
+        ]
+        return [{**img, 'offset': offset}, nested], extended_rows
+
+    count = len(pieces)
+    extended_rows = [extended(img, kind, i, count, p['offset'], p['file_offset'], p['size'])
+                     for i, p in enumerate(pieces)]
+    return [{**img, 'offset': offset}], extended_rows
+
+def generate_disk(disk_size=DISK_SIZE, output_image=OUTPUT_IMAGE, output_csv=OUTPUT_CSV,
+                  source_folder=DATASET_SOURCE, seed=None, noise_profile="random",
+                  scenario=None, false_signatures_per_mb=None, extended_csv=OUTPUT_EXTENDED_CSV,
+                  compress="none"):
+    """
+    Generates the synthetic disk image.
+
+    Every file is planned first and the pieces are laid out with random
+    noise gaps in between (see layout()), then the image is written front
+    to back (noise, file, noise...) in bounded chunks, so memory use does
+    not depend on the disk size.
+
+    The same seed always produces the same image; without one a seed is
+    picked and printed so the run can be repeated. noise_profile is one of
+    NOISE_PROFILES ("zeros" writes a sparse file).
+
+    scenario overrides DEFAULT_SCENARIO (scenarios.py) to fragment, truncate
+    or embed thumbnails into a share of the files, and false_signatures_per_mb
+    plants header/footer lookalikes into the noise. ground_truth.csv keeps
+    one row per file (first fragment offset, original size and MD5, embedded
+    thumbnails as their own rows); extended_csv has one row per written piece.
+
+    With compress="zstd" the image is written as seekable zstd (see
+    seekable_zstd.py, ".zst" is appended to the name), which the carver
+    reads with random access instead of unpacking it first.
+    """
+    images = get_valid_images(source_folder)
+    
+    if not images:
+        print("[-] No valid images found. Exiting.")
+        return
+
+    options = {**DEFAULT_SCENARIO, **(scenario or {})}
+
+    if seed is None:
+        seed = random.SystemRandom().randrange(2**32)
+    print(f"[*] Seed: {seed} (noise profile: {noise_profile})")
+    # Separate streams for placement and noise, both derived from the seed
+    rng = random.Random(seed)
+    noise = NoiseSource(noise_profile, seed, false_signatures_per_mb)
+    thumbnails = [img for img in images if is_jpeg(img) and img['size'] <= MAX_THUMBNAIL_SIZE]
+
+    plans = []
+    pieces = []
+    reserved = 0
+    scenario_counts = {}
+
+    print("[*] Planning image placement...")
+    for img in tqdm(images, desc="Disk Generation"):
+        file_size = img['size']
+        if file_size > disk_size:
+             print(f"[!] Skipping {img['filename']}: Larger than disk size.")
+             continue
+
+        kind = pick_scenario(rng, img, options, thumbnails)
+        plan = plan_image(img, kind, options, rng, thumbnails)
+        needed = reserved_size(plan['pieces'])
+        if reserved + needed > disk_size:
+             tqdm.write(f"[-] Could not find space for {img['filename']}: the disk is full.")
+             continue
+
+        reserved += needed
+        plans.append(plan)
+        pieces.extend(plan['pieces'])
+        scenario_counts[kind] = scenario_counts.get(kind, 0) + 1
+
+    pieces = layout(pieces, disk_size, rng)
+    injected_images = []
+    extended_rows = []
+    for plan in plans:
+        rows, plan_extended = plan_rows(plan)
+        injected_images.extend(rows)
+        extended_rows.extend(plan_extended)
+        print(f"[+] Successfully injected {rows[0]['filename']} ({plan['kind']}) at offset {rows[0]['offset']}")
+
+    if compress == "zstd":
+        if not output_image.endswith(".zst"):
+            output_image += ".zst"
+        try:
+            out = SeekableZstdWriter(output_image)
+        except RuntimeError as e:
+            print(f"[-] Error: {e}")
+            return
+    else:
+        out = open(output_image, "wb")
+
+    print(f"[*] Writing {disk_size/1024/1024:.2f} MB disk image to {output_image}...")
+    # Fill gaps before, between, and after pieces with noise, streaming the
+    # image files in between.
+    current_pos = 0
+    with out as f, tqdm(total=disk_size, unit='B', unit_scale=True, desc="Writing") as pbar:
+        for piece in pieces:
+            gap_size = piece['offset'] - current_pos
+            noise.write(f, gap_size)
+            copy_piece(piece, f)
+            current_pos = piece['offset'] + piece['size']
+            pbar.update(gap_size + piece['size'])
+
+        noise.write(f, disk_size - current_pos)
+        # A trailing hole (zeros profile) only exists once the file length is set
+        f.truncate(disk_size)
+        pbar.update(disk_size - current_pos)
+
+    print(f"[*] Writing ground truth CSV to {output_csv}...")
+    with open(output_csv, "w", newline="") as csvfile:
+        fieldnames = ["filename", "md5_hash", "start_offset_decimal", "file_size_bytes"]
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+        for img in injected_images:
+            writer.writerow({
+                "filename": img['filename'],
+                "md5_hash": img['md5'],
+                "start_offset_decimal": img['offset'],
+                "file_size_bytes": img['size']
+            })
+
+    print(f"[*] Writing extended ground truth CSV to {extended_csv}...")
+    with open(extended_csv, "w", newline="") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=EXTENDED_FIELDS)
+        writer.writeheader()
+        writer.writerows(extended_rows)
+
+    # Summary
+    written_bytes = sum(piece['size'] for piece in pieces)
+    total_files = len(injected_images)
+    total_data_size = written_bytes / (1024 * 1024)
+    disk_utilization = (written_bytes / disk_size) * 100
+    
+    print("\n" + "="*30)
+    print("SUMMARY")
+    print("="*30)
+    print(f"Total Files: {total_files}")
+    for kind, count in sorted(scenario_counts.items()):
+        print(f"  - {kind}: {count}")
+    print(f"Total Data Size: {total_data_size:.2f} MB")
+    print(f"Disk Utilization: {disk_utilization:.2f}%")
+    print("="*30)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic raw disk image with hidden images.")
+    parser.add_argument("--size", type=parse_size, default=DISK_SIZE, help="Disk size, e.g. 100M, 500G (default 100M)")
+    parser.add_argument("--source", default=DATASET_SOURCE, help="Folder with the JPG/PNG files to inject")
+    parser.add_argument("--output", default=OUTPUT_IMAGE, help="Disk image to write")
+    parser.add_argument("--csv", default=OUTPUT_CSV, help="Ground truth CSV to write")
+    parser.add_argument("--seed", type=int, help="Seed for placement and noise; the same seed gives the same image")
+    parser.add_argument("--noise", default="random", choices=NOISE_PROFILES, help="Noise profile between files")
+    parser.add_argument("--extended-csv", default=OUTPUT_EXTENDED_CSV, help="Per-piece ground truth CSV to write")
+    parser.add_argument("--compress", default="none", choices=COMPRESSIONS,
+                        help="Write the image as seekable zstd (.zst) instead of raw")
+    # Scenarios
+    parser.add_argument("--fragment-ratio", type=float, default=DEFAULT_SCENARIO["fragment_ratio"],
+                        help="Share of files split into non-contiguous fragments")
+    parser.add_argument("--fragments", type=int, default=DEFAULT_SCENARIO["fragments"],
+                        help="Fragments per fragmented file")
+    parser.add_argument("--cluster-size", type=parse_size, default=DEFAULT_SCENARIO["cluster_size"],
+                        help="Cluster size fragments are cut and aligned on")
+    parser.add_argument("--embed-ratio", type=float, default=DEFAULT_SCENARIO["embed_ratio"],
+                        help="Share of JPEGs that get another JPEG embedded as an EXIF thumbnail")
+    parser.add_argument("--truncate-ratio", type=float, default=DEFAULT_SCENARIO["truncate_ratio"],
+                        help="Share of files of which only a leading part is written")
+    parser.add_argument("--false-signatures", type=float,
+                        help="Header/footer lookalikes planted per MB of noise (default: 16 for realistic, else 0)")
+    args = parser.parse_args()
+
+    scenario = {
+        "fragment_ratio": args.fragment_ratio,
+        "fragments": args.fragments,
+        "cluster_size": args.cluster_size,
+        "embed_ratio": args.embed_ratio,
+        "truncate_ratio": args.truncate_ratio,
+    }
+    generate_disk(disk_size=args.size, output_image=args.output, output_csv=args.csv, source_folder=args.source,
+                  seed=args.seed, noise_profile=args.noise, scenario=scenario,
+                  false_signatures_per_mb=args.false_signatures, extended_csv=args.extended_csv,
+                  compress=args.compress)
@@ -0,0 +1,64 @@
+import struct
+
+# Scenario options and their defaults (all ratios are shares of the source files)
+DEFAULT_SCENARIO = {
+    "fragment_ratio": 0.0,   # files split into non-contiguous fragments
+    "fragments": 3,          # fragments per fragmented file (fewer if the file is too small)
+    "cluster_size": 4096,    # fragments are cut and placed on cluster boundaries
+    "embed_ratio": 0.0,      # JPEGs that get another JPEG embedded as an EXIF thumbnail
+    "truncate_ratio": 0.0,   # files of which only a leading part is written
+}
+
+# Largest thumbnail that fits in one APP1 segment next to the "Exif\0\0" tag
+MAX_THUMBNAIL_SIZE = 0xFFFF - 2 - 6
+
+# Where the thumbnail's APP1 segment goes in the host JPEG: right after the SOI marker
+EXIF_INSERT_POS = 2
+
+def is_jpeg(img):
+    return img['filename'].lower().endswith(('.jpg', '.jpeg'))
+
+def pick_scenario(rng, img, options, thumbnails):
+    """
+    Picks how one source file is placed: "contiguous", "fragmented",
+    "truncated" or "embedded" (only JPEGs, and only if a thumbnail is available).
+    """
+    roll = rng.random()
+    if roll < options["fragment_ratio"]:
+        return "fragmented"
+    roll -= options["fragment_ratio"]
+    if roll < options["truncate_ratio"] and img['size'] > 1:
+        return "truncated"
+    roll -= options["truncate_ratio"]
+    if roll < options["embed_ratio"] and is_jpeg(img) and any(t is not img for t in thumbnails):
+        return "embedded"
+    return "contiguous"
+
+def split_fragments(size, count, cluster_size, rng):
+    """
+    Splits a file of `size` bytes into up to `count` pieces cut on cluster
+    boundaries. Returns a list of (file_offset, length).
+    """
+    clusters = (size + cluster_size - 1) // cluster_size
+    count = min(count, clusters)
+    if count < 2:
+        return [(0, size)]
+    cuts = sorted(rng.sample(range(1, clusters), count - 1))
+    bounds = [0] + [cut * cluster_size for cut in cuts] + [size]
+    return [(bounds[i], bounds[i + 1] - bounds[i]) for i in range(count)]
+
+def truncated_size(size, rng):
+    """Picks how many leading bytes of a truncated file are kept (10% to 90%)."""
+    return max(1, min(size - 1, rng.randint(size // 10, size * 9 // 10)))
+
+def exif_segment(thumbnail):
+    """
+    Wraps `thumbnail` in an EXIF APP1 segment, the way cameras embed previews
+    right after the SOI of a JPEG (at EXIF_INSERT_POS). Returns the segment
+    and the offset of the thumbnail inside it.
+    """
+    if len(thumbnail) > MAX_THUMBNAIL_SIZE:
+        raise ValueError("Thumbnail does not fit in one APP1 segment")
+    payload = b'Exif\x00\x00' + thumbnail
+    segment = b'\xFF\xE1' + struct.pack(">H", len(payload) + 2) + payload
+    return segment, 4 + 6
@@ -0,0 +1,83 @@
+import os
+import struct
+
+try:
+    import zstandard
+except ImportError:  # only needed for --compress zstd
+    zstandard = None
+
+# Seekable zstd format (zstd contrib/seekable_format): independent frames
+# followed by a skippable frame holding the seek table.
+SKIPPABLE_MAGIC = 0x184D2A5E
+SEEKABLE_MAGIC = 0x8F92EAB1
+
+# Uncompressed bytes per frame, the unit a reader decompresses for a random read
+FRAME_SIZE = 4 * 1024 * 1024  # 4MB
+COMPRESSION_LEVEL = 3
+
+class SeekableZstdWriter:
+    """
+    Write-only file object producing a seekable zstd file.
+
+    Supports the calls the generator makes on its output: write(), a forward
+    seek(n, SEEK_CUR) (the hole is written as zeros, which compress to
+    almost nothing) and truncate(size) to extend the image with zeros.
+    """
+
+    def __init__(self, path, frame_size=FRAME_SIZE, level=COMPRESSION_LEVEL):
+        if zstandard is None:
+            raise RuntimeError("Writing seekable zstd needs the zstandard package (pip install zstandard)")
+        self.file = open(path, "wb")
+        self.frame_size = frame_size
+        self.compressor = zstandard.ZstdCompressor(level=level)
+        self.buffer = bytearray()
+        self.frames = []  # (compressed size, decompressed size)
+        self.position = 0
+
+    def _flush_frame(self, size):
+        frame = self.compressor.compress(bytes(self.buffer[:size]))
+        self.file.write(frame)
+        self.frames.append((len(frame), size))
+        del self.buffer[:size]
+
+    def write(self, data):
+        self.buffer += data
+        self.position += len(data)
+        while len(self.buffer) >= self.frame_size:
+            self._flush_frame(self.frame_size)
+        return len(data)
+
+    def _write_zeros(self, size):
+        zeros = bytes(min(size, self.frame_size))
+        while size > 0:
+            size -= self.write(zeros[:size])
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        target = offset if whence == os.SEEK_SET else self.position + offset
+        if whence not in (os.SEEK_SET, os.SEEK_CUR) or target < self.position:
+            raise OSError("A seekable zstd image can only be written front to back")
+        self._write_zeros(target - self.position)
+        return self.position
+
+    def truncate(self, size):
+        if size < self.position:
+            raise OSError("A seekable zstd image cannot be shortened")
+        self._write_zeros(size - self.position)
+        return size
+
+    def close(self):
+        if self.file.closed:
+            return
+        if self.buffer:
+            self._flush_frame(len(self.buffer))
+        # Seek table: one entry per frame, then the footer (no checksums)
+        table = b"".join(struct.pack("<II", compressed, size) for compressed, size in self.frames)
+        table += struct.pack("<IBI", len(self.frames), 0, SEEKABLE_MAGIC)
+        self.file.write(struct.pack("<II", SKIPPABLE_MAGIC, len(table)) + table)
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
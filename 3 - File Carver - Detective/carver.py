@@ -1,183 +1,648 @@
-import os
-import mmap
-from tqdm import tqdm
-
-def recover_files(disk_image_path, output_dir):
-    """
-    Recover JPG and PNG files from a raw disk image using file carving.
-    """
-    
-    # Signatures
-    # JPEG: Start FF D8, End FF D9
-    JPEG_START = b'\xFF\xD8'
-    JPEG_END = b'\xFF\xD9'
-    
-    # PNG: Start 89 50 4E 47 0D 0A 1A 0A, End IEND (plus 4 bytes CRC)
-    PNG_START = b'\x89\x50\x4E\x47\x0D\x0A\x1A\x0A'
-    PNG_END_MARKER = b'IEND'
-    
-    # Constraints
-    MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
-    
-    if not os.path.exists(disk_image_path):
-        print(f"Error: Disk image '{disk_image_path}' not found.")
-        return
-
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-        print(f"Created output directory: {output_dir}")
-
-    file_size = os.path.getsize(disk_image_path)
-    
-    jpg_count = 0
-    png_count = 0
-    
-    print(f"Scanning {disk_image_path} ({file_size / (1024*1024):.2f} MB)...")
-
-    with open(disk_image_path, "rb") as f:
-        # Memory map the file for efficient reading
-        # acccess=mmap.ACCESS_READ works for Windows too
-        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
-            
-            # We will use tqdm for a progress bar. 
-            # Since we jump around or scan linearly, we can update it manually or just use it for the main loop if we were reading chunk by chunk.
-            # However, since we are using find(), it's harder to map exactly to a progress bar of bytes processed linearly 
-            # because we skip or search. 
-            # A simple approach is to update a pbar based on current offset, but find() jumps.
-            # Let's use a manual progress bar updated with current position.
-            
-            pbar = tqdm(total=file_size, unit='B', unit_scale=True, desc="Scanning")
-            
-            cursor = 0
-            while cursor < file_size:
-                # Update progress bar
-                pbar.n = cursor
-                pbar.refresh()
-
-                # Search for signatures
-                # We need to find the earliest occurrence of EITHER JPEG or PNG start
-                
-                # Check for remaining bytes
-                if cursor >= file_size:
-                    break
-                
-                # Search for headers from current cursor
-                jpg_start_pos = mm.find(JPEG_START, cursor)
-                png_start_pos = mm.find(PNG_START, cursor)
-                
-                # Determine which one appears first
-                next_start = -1
-                file_type = None
-                
-                if jpg_start_pos != -1 and png_start_pos != -1:
-                    if jpg_start_pos < png_start_pos:
-                        next_start = jpg_start_pos
-                        file_type = 'JPG'
-                    else:
-                        next_start = png_start_pos
-                        file_type = 'PNG'
-                elif jpg_start_pos != -1:
-                    next_start = jpg_start_pos
-                    file_type = 'JPG'
-                elif png_start_pos != -1:
-                    next_start = png_start_pos
-                    file_type = 'PNG'
-                else:
-                    # No more signatures found
-                    cursor = file_size
-                    continue
-                
-                # Move cursor to the start of the found file
-                cursor = next_start
-                
-                # Now search for the footer
-                start_offset = cursor
-                end_offset = -1
-                
-                if file_type == 'JPG':
-                    # Search for JPG Footer
-                    # We start searching after the header
-                    footer_pos = mm.find(JPEG_END, start_offset + 2)
-                    if footer_pos != -1:
-                        # The footer is 2 bytes \xFF\xD9. The end_offset should include these bytes.
-                        # so match is at footer_pos. content ends at footer_pos + 2.
-                        candidate_end = footer_pos + 2
-                        size = candidate_end - start_offset
-                        
-                        # Sanity Check: If size > 10MB, it's likely a false positive start or we missed the real footer.
-                        # However, with find(), we found the *nearest* footer. 
-                        # If the nearest footer makes it > 10MB, then maybe the start was false.
-                        # OR if the file really is > 10MB (but constraint says ignore).
-                        
-                        if size <= MAX_FILE_SIZE:
-                            end_offset = candidate_end
-                        else:
-                            # Too big, ignore this start signature and move on?
-                            # Or strictly, if we found a footer but it makes file too big, 
-                            # we should assume this START was a false positive, and advance cursor by 1 
-                            # (or strictly just past the start sig) to try finding another start?
-                            # For safety/simplicity: If > 10MB, treat as invalid.
-                            pass
-                    
-                elif file_type == 'PNG':
-                    # Search for PNG Footer "IEND"
-                    footer_pos = mm.find(PNG_END_MARKER, start_offset + 8)
-                    if footer_pos != -1:
-                        # PNG ends with IEND + 4 bytes CRC.
-                        # IEND is 4 bytes. CRC is 4 bytes. Total 8 bytes for footer part?
-                        # No, Footer is the IEND chunk.
-                        # IEND chunk: Length (4 bytes, always 0), Chunk Type (4 bytes "IEND"), CRC (4 bytes).
-                        # The "IEND" string we match is the Chunk Type.
-                        # So we have 4 bytes before "IEND" (length) and 4 bytes after (CRC).
-                        # BUT, standard carving usually looks for "IEND" string.
-                        # The spec says: The IEND chunk must appear LAST. 
-                        # Its data length is 0. 
-                        # So: [00 00 00 00] [49 45 4E 44] [AE 42 60 82]
-                        # We found "IEND".
-                        # The end of the file is IEND_pos + 4 ("IEND") + 4 (CRC) = IEND_pos + 8.
-                        
-                        candidate_end = footer_pos + 8
-                        size = candidate_end - start_offset
-                        
-                        if size <= MAX_FILE_SIZE:
-                            end_offset = candidate_end
-
-                # Extract if valid
-                if end_offset != -1:
-                    filename = f"recovered_{start_offset}.{file_type.lower()}"
-                    filepath = os.path.join(output_dir, filename)
-                    
-                    try:
-                        # Write data
-                        # Since mm is memory mapped, we can slice it
-                        data = mm[start_offset:end_offset]
-                        with open(filepath, 'wb') as out:
-                            out.write(data)
-                        
-                        if file_type == 'JPG':
-                            jpg_count += 1
-                        else:
-                            png_count += 1
-                            
-                        # Advance cursor to end of this file
-                        cursor = end_offset
-                    except Exception as e:
-                        print(f"Error writing {filename}: {e}")
-                        # Advance slightly to avoid infinite loop if write fails
-                        cursor = start_offset + 1
-                else:
-                    # Valid footer not found within range or size limit.
-                    # Treat start as false positive.
-                    # Advance cursor past the current start signature to continue search
-                    cursor = start_offset + 1
-
-            pbar.close()
-
-    print("\nScanning Complete.")
-    print(f"Found {jpg_count} potential JPGs and {png_count} potential PNGs.")
-
-if __name__ == "__main__":
-    DISK_IMAGE = "test_disk.img"
-    OUTPUT_FOLDER = "recovered_files"
-    
-    recover_files(DISK_IMAGE, OUTPUT_FOLDER)
+import argparse
+import os
+import mmap
+import sys
+from bisect import bisect_left
+from contextlib import contextmanager
+from tqdm import tqdm
+
+from scanner import SignatureScanner, collect_signatures
+from parallel import parallel_scan
+from extract import Extractor, METHODS
+from stream import carve_stream, BLOCK_SIZE
+from structure import TRUNCATED
+from formats import get_formats, load_format_file, load_entry_points
+from catalog import Catalog, hash_bytes
+from metrics import CarveMetrics, phase_timer
+from checkpoint import Checkpoint, CHECKPOINT_FILE, run_key
+from signature_index import SignatureIndex, INDEX_SUFFIX
+from pairing import pair_candidates
+from writer import WriteBehind, WRITER_THREADS, shard_name
+from containers import BlockReader, open_container, open_stream, check_window
+from entropy import EntropyMap
+
+# Constraints
+# Largest file accepted for formats that do not set their own max_size
+MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+
+# Catalog of carves (default path used by catalog-only runs)
+CATALOG_FILE = "carve_catalog.csv"
+
+# Bytes scanned between progress bar updates
+SCAN_CHUNK_SIZE = 64 * 1024 * 1024  # 64MB
+
+# Minimum seconds between progress bar refreshes
+PROGRESS_INTERVAL = 0.5
+
+def _scan_chunks(image, file_size, scanner, start=0, regions=None):
+    """
+    Scans the image (mmap or container) chunk by chunk in this process, from
+    `start` on. With regions (an EntropyMap) the blocks it can skip are not scanned.
+    """
+    for chunk_start in range(start, file_size, SCAN_CHUNK_SIZE):
+        chunk_end = min(chunk_start + SCAN_CHUNK_SIZE, file_size)
+        ranges = regions.ranges(chunk_start, chunk_end, scanner) if regions else [(chunk_start, chunk_end)]
+        headers = []
+        footers = {}
+        for range_start, range_end in ranges:
+            if isinstance(image, BlockReader):
+                # Only this range is decompressed, plus the overlap a straddling signature needs
+                buf = image.read(range_start, range_end + scanner.max_len - 1)
+                range_headers, range_footers = collect_signatures(scanner, buf, 0, range_end - range_start,
+                                                                  base=range_start)
+            else:
+                range_headers, range_footers = collect_signatures(scanner, image, range_start, range_end)
+            headers.extend(range_headers)
+            for name, offsets in range_footers.items():
+                footers.setdefault(name, []).extend(offsets)
+        yield chunk_end - chunk_start, headers, footers
+
+@contextmanager
+def _open_image(disk_image_path, container, extract_method):
+    """
+    Yields (image, extractor): the read-only mapping of a raw image and an
+    Extractor on it, or the container's BlockReader as both.
+    """
+    if container:
+        try:
+            yield container, container
+        finally:
+            container.close()
+        return
+    with open(disk_image_path, "rb") as f:
+        # Memory map the file for efficient reading
+        # acccess=mmap.ACCESS_READ works for Windows too
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm, Extractor(f, mm, method=extract_method)
+
+def _index_missing(index, image, disk_image_path, file_size, scanner, workers, regions=None):
+    """
+    Scans the image once for the scanner's patterns that are not in the index
+    yet and adds them. Returns the number of bytes scanned and the number the
+    entropy map let it skip (both 0 if no pattern was missing).
+    """
+    missing = index.missing(scanner.patterns)
+    if not missing:
+        return 0, 0
+
+    # One header-only descriptor per pattern, so every match is reported under its own pattern
+    pattern_formats = [{"name": pattern.hex(), "header": pattern} for pattern in missing]
+    pattern_scanner = SignatureScanner(pattern_formats)
+    if workers > 1:
+        chunks = parallel_scan(disk_image_path, file_size, pattern_formats, workers, SCAN_CHUNK_SIZE,
+                               regions=regions)
+    else:
+        chunks = _scan_chunks(image, file_size, pattern_scanner, regions=regions)
+
+    offsets = {pattern.hex(): [] for pattern in missing}
+    pbar = tqdm(total=file_size, unit='B', unit_scale=True, desc="Indexing",
+                mininterval=PROGRESS_INTERVAL)
+    for scanned, chunk_headers, _ in chunks:
+        for offset, name in chunk_headers:
+            offsets[name].append(offset)
+        pbar.update(scanned)
+    pbar.close()
+
+    index.add({pattern: offsets[pattern.hex()] for pattern in missing})
+    skipped = regions.skipped_bytes(pattern_scanner) if regions else 0
+    return file_size - skipped, skipped
+
+def _drop_failed(failed, counts, catalog, metrics):
+    """
+    Takes carves whose file could not be written (writer tags of
+    (filename, file_type, start offset, length)) back out of the counts,
+    metrics and catalog, and reports the regions they covered: the carve had
+    already moved past them, so no other candidate inside was tried.
+    """
+    if not failed:
+        return
+    for filename, file_type, start_offset, length in failed:
+        counts[file_type] -= 1
+        if metrics:
+            metrics.add("files_carved", -1, format=file_type)
+            metrics.add("bytes_written", -length, format=file_type)
+            metrics.add("write_errors", format=file_type)
+        print(f"Bytes {start_offset}-{start_offset + length} ({filename}) were not searched for other files.")
+    if catalog:
+        catalog.drop(filename for filename, _, _, _ in failed)
+    print(f"{len(failed)} files could not be written and were left out of the results "
+          f"(--writer-threads 0 retries the candidates inside them).")
+
+def _summary(counts):
+    """Formats the per-format carve counts, e.g. 'Found 3 potential JPGs and 2 potential PNGs.'"""
+    parts = [f"{count} potential {name}s" for name, count in counts.items()]
+    if len(parts) > 1:
+        parts = [", ".join(parts[:-1]), parts[-1]]
+    return f"Found {' and '.join(parts)}."
+
+def recover_files(disk_image_path, output_dir, workers=1, catalog_path=None,
+                  catalog_only=False, extract_method="auto", validate=True, formats=None,
+                  digests=("md5",), metrics_path=None, checkpoint_path=None, resume=False,
+                  index_dir=None, writer_threads=WRITER_THREADS, shard_size=None,
+                  entropy_map=False, heatmap_path=None):
+    """
+    Recover files from a raw disk image using file carving.
+
+    formats is a list of format descriptors (see formats.py), by default every
+    registered format (JPG and PNG unless more were loaded).
+
+    With workers > 1 the signature scan is split over that many processes.
+    Pairing and extraction stay in this process, so the output is identical
+    to a single-process run.
+
+    If catalog_path is given, every carve is also recorded there (CSV, or JSON
+    lines for a .jsonl path) with its type, offset, length and the `digests`
+    hashed from the mapped bytes at carve time, so the validator does not have
+    to read the files back. With catalog_only=True nothing is written to
+    output_dir; the catalog is the only output.
+
+    With validate=True (default) each candidate of a format with a structure
+    check (JPEG segments, PNG chunks) is walked before anything is written;
+    candidates that are not well formed are rejected and the end offset comes
+    from the structure, not the first footer.
+
+    If metrics_path is given, per-format counters (signature hits, footer
+    lookups, rejections by reason, bytes written) and per-phase timings are
+    collected and saved there (see metrics.py). They are off by default so the
+    hot loop pays nothing for them.
+
+    If checkpoint_path is given, progress is journaled there (see checkpoint.py)
+    every CHECKPOINT_INTERVAL seconds. With resume=True a run interrupted
+    after its last checkpoint continues from it instead of from offset 0; the
+    checkpoint is removed once the run completes.
+
+    If index_dir is given, the signature offsets are taken from a persistent
+    index there (see signature_index.py) instead of a scan. Signatures the
+    index lacks are scanned for once and added, so re-carving the same image
+    with other limits, formats or validation settings only reads the
+    candidate regions.
+
+    Files are written behind the carving loop by `writer_threads` threads
+    (see writer.py; 0 writes inline). With shard_size, output files go into
+    numbered subdirectories of shard_size files each, and catalog filenames
+    include the subdirectory.
+
+    Compressed or split evidence (seekable .zst, .gz, .001 segments) is read
+    in place through a block reader with an LRU cache (see containers.py)
+    instead of being mapped; its scan runs in this process.
+
+    With entropy_map=True a numpy pre-pass computes per-block statistics
+    (see entropy.py) and the signature scan leaves out uniform blocks (zero
+    fill, wiped areas), which cannot hold a signature; the carves are the
+    same as without it. heatmap_path saves the map (PNG heatmap, or CSV for
+    a .csv path) and also runs the pre-pass.
+    """
+    
+    if not os.path.exists(disk_image_path):
+        print(f"Error: Disk image '{disk_image_path}' not found.")
+        return
+
+    if catalog_only and not catalog_path:
+        catalog_path = CATALOG_FILE
+
+    if not catalog_only and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+        print(f"Created output directory: {output_dir}")
+
+    if formats is None:
+        formats = get_formats()
+    formats_by_name = {fmt["name"]: fmt for fmt in formats}
+
+    counts = {name: 0 for name in formats_by_name}
+    rejected_count = 0
+
+    # Scan and pairing state, restored from the checkpoint when resuming
+    headers = []
+    footers = {name: [] for name in formats_by_name}
+    scan_start = 0
+    next_candidate = 0
+    cursor = 0
+    catalog_size = None
+
+    if resume and not checkpoint_path:
+        checkpoint_path = CHECKPOINT_FILE
+    checkpoint = None
+    if checkpoint_path:
+        key = run_key(disk_image_path, formats, {
+            "max_file_size": MAX_FILE_SIZE, "chunk_size": SCAN_CHUNK_SIZE, "validate": validate,
+            "output_dir": None if catalog_only else os.path.abspath(output_dir),
+            "catalog_path": catalog_path and os.path.abspath(catalog_path), "digests": list(digests),
+            "shard_size": shard_size,
+        })
+        checkpoint = Checkpoint(checkpoint_path, key)
+        if resume:
+            try:
+                restored = checkpoint.load()
+            except ValueError as e:
+                print(f"Error: {e}.")
+                return
+            if restored is None:
+                print(f"No checkpoint at {checkpoint_path}, starting from the beginning.")
+            else:
+                headers, restored_footers = restored
+                for name, offsets in restored_footers.items():
+                    footers[name].extend(offsets)
+                state = checkpoint.state
+                scan_start = state["scanned"]
+                next_candidate = state["next_candidate"]
+                cursor = state["cursor"]
+                counts.update(state["counts"])
+                rejected_count = state["rejected"]
+                catalog_size = state["catalog_size"]
+                print(f"Resuming from checkpoint {checkpoint_path} "
+                      f"(scanned {scan_start / (1024*1024):.2f} MB, {sum(counts.values())} files carved).")
+
+    signature_index = None
+    if index_dir:
+        try:
+            signature_index = SignatureIndex(index_dir, disk_image_path)
+        except RuntimeError as e:
+            print(f"Error: {e}.")
+            return
+
+    # Opened once the settings are checked, so an early return leaves no handle open
+    try:
+        container = open_container(disk_image_path)
+    except (RuntimeError, ValueError) as e:
+        print(f"Error: {e}.")
+        return
+    if container:
+        file_size = len(container)
+        if workers > 1:
+            # The worker processes map the image, a container is decompressed here instead
+            print("Compressed and split images are scanned in one process.")
+            workers = 1
+    else:
+        file_size = os.path.getsize(disk_image_path)
+
+    regions = None
+    if entropy_map or heatmap_path:
+        try:
+            regions = EntropyMap(file_size)
+        except RuntimeError as e:
+            print(f"Error: {e}.")
+            if container:
+                container.close()
+            return
+
+    print(f"Scanning {disk_image_path} ({file_size / (1024*1024):.2f} MB)...")
+
+    catalog = Catalog(catalog_path, digests, resume_at=catalog_size) if catalog_path else None
+    metrics = CarveMetrics() if metrics_path else None
+
+    scanner = SignatureScanner(formats)
+
+    with _open_image(disk_image_path, container, extract_method) as (image, extractor):
+
+        if regions:
+            # Pre-pass: entropy and uniform blocks, one vectorized pass over the image
+            pbar = tqdm(total=file_size, unit='B', unit_scale=True, desc="Entropy",
+                        mininterval=PROGRESS_INTERVAL)
+            with phase_timer(metrics, "entropy"):
+                for analysed in regions.compute(image):
+                    pbar.update(analysed)
+            pbar.close()
+            if heatmap_path:
+                regions.save(heatmap_path)
+                print(f"Entropy map saved to {heatmap_path}")
+            if entropy_map:
+                print(f"Skipping {regions.skipped_bytes(scanner) / (1024*1024):.2f} MB of uniform blocks.")
+            else:
+                regions = None
+
+        # Phase 1: one linear pass collecting every header and footer offset.
+        # The image is scanned in chunks so the progress bar can move (and, with
+        # workers > 1, so the chunks can be spread over processes); the scanner
+        # handles signatures that straddle chunk boundaries.
+        if signature_index:
+            # Every offset comes from the index, there is no scan to journal or resume
+            with phase_timer(metrics, "scan"):
+                scanned_bytes, skipped_bytes = _index_missing(signature_index, image, disk_image_path,
+                                                              file_size, scanner, workers, regions)
+                headers, footers = signature_index.signatures(scanner)
+            print(f"Using signature index {index_dir}.")
+        else:
+            if workers > 1:
+                print(f"Using {workers} worker processes.")
+                chunks = parallel_scan(disk_image_path, file_size, formats, workers, SCAN_CHUNK_SIZE,
+                                       start=scan_start, regions=regions)
+            else:
+                chunks = _scan_chunks(image, file_size, scanner, start=scan_start, regions=regions)
+
+            if checkpoint:
+                checkpoint.open_signatures()
+
+            pbar = tqdm(total=file_size, initial=scan_start, unit='B', unit_scale=True, desc="Scanning",
+                        mininterval=PROGRESS_INTERVAL)
+            scan_cursor = scan_start
+            with phase_timer(metrics, "scan"):
+                for scanned, chunk_headers, chunk_footers in chunks:
+                    # Chunks arrive in image order, so appending keeps every list sorted
+                    headers.extend(chunk_headers)
+                    for name, offsets in chunk_footers.items():
+                        footers[name].extend(offsets)
+                    pbar.update(scanned)
+                    scan_cursor += scanned
+                    if checkpoint:
+                        checkpoint.add_chunk(scan_cursor, chunk_headers, chunk_footers)
+                        if checkpoint.due():
+                            checkpoint.save(catalog)
+            pbar.close()
+            # Uniform blocks the entropy map left out were not scanned
+            skipped_bytes = regions.skipped_bytes(scanner, scan_start) if regions else 0
+            scanned_bytes = file_size - scan_start - skipped_bytes
+
+            if checkpoint:
+                checkpoint.save(catalog)
+                checkpoint.close_signatures()
+
+        if metrics:
+            metrics.add("bytes_scanned", scanned_bytes)
+            if skipped_bytes:
+                metrics.add("bytes_skipped", skipped_bytes)
+            for _, name in headers:
+                metrics.add("header_hits", format=name)
+            for name, offsets in footers.items():
+                metrics.add("footer_hits", len(offsets), format=name)
+
+        writer = None
+        if not catalog_only:
+            print(f"Extracting with {extractor.method}.")
+            writer = WriteBehind(extractor, threads=writer_threads)
+
+        # Phase 2: pair every header with the nearest footer of its format in
+        # one batch (see pairing.py), then walk the surviving candidates in
+        # image order. A carve moves the cursor past its end, and a bisect
+        # jumps over every candidate that starts inside it.
+        with phase_timer(metrics, "pair"):
+            starts, ends, types, pair_rejected = pair_candidates(headers, footers, formats, MAX_FILE_SIZE)
+        if metrics:
+            # Lookups that found no usable footer; the others count once the walk reaches them
+            for (file_type, reason), count in pair_rejected.items():
+                metrics.add("footer_searches", count, format=file_type)
+                metrics.add("rejected", count, format=file_type, reason=reason)
+
+        index = next_candidate
+        while index < len(starts):
+            if checkpoint and checkpoint.due():
+                # Every candidate before `index` is decided and its file written
+                if writer:
+                    writer.drain()
+                    _drop_failed(writer.failures(), counts, catalog, metrics)
+                checkpoint.save(catalog, next_candidate=index, cursor=cursor,
+                                counts=counts, rejected=rejected_count)
+
+            start_offset = starts[index]
+            # Candidates inside an already carved file are skipped
+            if start_offset < cursor:
+                index = bisect_left(starts, cursor, index)
+                continue
+
+            file_type = types[index]
+            # end_offset includes the footer itself (and, for PNG, the CRC after IEND)
+            end_offset = ends[index]
+            index += 1
+            if metrics:
+                metrics.add("footer_searches", format=file_type)
+
+            fmt = formats_by_name[file_type]
+            max_size = fmt["max_size"] or MAX_FILE_SIZE
+
+            # Structure check: walk the format's segments/chunks to reject
+            # noise and to take the real end of the file from its structure.
+            if validate and fmt["check"]:
+                stop = min(start_offset + max_size, file_size)
+                with phase_timer(metrics, "validate"):
+                    if container:
+                        checked_end = check_window(container, fmt["check"], start_offset, stop, end_offset)
+                    else:
+                        checked_end = fmt["check"](image, start_offset, stop)
+                if checked_end is None or checked_end == TRUNCATED:
+                    rejected_count += 1
+                    if metrics:
+                        metrics.add("rejected", format=file_type, reason="structure")
+                    continue
+                end_offset = checked_end
+
+            filename = shard_name(f"recovered_{start_offset}.{fmt['extension']}",
+                                  sum(counts.values()), shard_size)
+            filepath = os.path.join(output_dir, filename)
+
+            # Like slicing, a carve running past the end of the image is truncated
+            length = min(end_offset, file_size) - start_offset
+
+            try:
+                if writer:
+                    # Copied straight from the image by a writer thread, no per-file
+                    # bytes object; "write" time is what the loop waits on the queue
+                    with phase_timer(metrics, "write"):
+                        written = writer.submit(start_offset, end_offset, filepath,
+                                                tag=(filename, file_type, start_offset, length))
+                    if not written:
+                        # An inline write failed: the cursor stays, so candidates inside it are tried
+                        if metrics:
+                            metrics.add("write_errors", format=file_type)
+                        continue
+
+                if catalog:
+                    with phase_timer(metrics, "hash"):
+                        if container:
+                            file_digests = hash_bytes(container.read(start_offset, start_offset + length),
+                                                      digests)
+                        else:
+                            # Hash the mapped bytes in place, no copy of the file
+                            with memoryview(image) as view:
+                                file_digests = hash_bytes(view[start_offset:start_offset + length], digests)
+                    catalog.write(filename, file_type, start_offset, length, file_digests)
+
+                counts[file_type] += 1
+                if metrics:
+                    metrics.add("files_carved", format=file_type)
+                    if not catalog_only:
+                        metrics.add("bytes_written", length, format=file_type)
+
+                # Advance cursor to end of this file
+                cursor = end_offset
+            except Exception as e:
+                print(f"Error writing {filename}: {e}")
+
+        if writer:
+            # Finish the queued files while the image is still mapped
+            _drop_failed(writer.close(), counts, catalog, metrics)
+
+    if catalog:
+        catalog.close()
+        print(f"Catalog saved to {catalog_path}")
+
+    if checkpoint:
+        # The run is complete, a later --resume has nothing to continue
+        checkpoint.remove()
+
+    if metrics:
+        metrics.save(metrics_path)
+        print(f"Metrics saved to {metrics_path}")
+
+    print("\nScanning Complete.")
+    print(_summary(counts))
+    if validate:
+        print(f"Rejected {rejected_count} candidates that failed the structure check.")
+
+def recover_stream(stream, output_dir, catalog_path=None, catalog_only=False,
+                   block_size=BLOCK_SIZE, name="<stream>", validate=True, formats=None,
+                   digests=("md5",), metrics_path=None, shard_size=None):
+    """
+    Recover files from a non-seekable input such as stdin or a pipe.
+
+    The input is read block by block and each carve is written as soon as it
+    is complete, so memory use is bounded by MAX_FILE_SIZE plus block_size
+    instead of the image size. Output names and catalog rows match recover_files,
+    and metrics_path and shard_size work the same way. Files are written
+    inline, the block buffer they come from is reused right after.
+    """
+    if catalog_only and not catalog_path:
+        catalog_path = CATALOG_FILE
+
+    if not catalog_only and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+        print(f"Created output directory: {output_dir}")
+
+    if formats is None:
+        formats = get_formats()
+    formats_by_name = {fmt["name"]: fmt for fmt in formats}
+    counts = {name: 0 for name in formats_by_name}
+
+    print(f"Streaming {name}...")
+
+    catalog = Catalog(catalog_path, digests) if catalog_path else None
+    metrics = CarveMetrics() if metrics_path else None
+    rejected = {}
+
+    with tqdm.wrapattr(stream, "read", unit='B', unit_scale=True, desc="Scanning",
+                       mininterval=PROGRESS_INTERVAL) as reader:
+        carves = carve_stream(reader, formats, MAX_FILE_SIZE, block_size, validate=validate, metrics=metrics,
+                              rejected=rejected)
+        for start_offset, file_type, data in carves:
+            filename = shard_name(f"recovered_{start_offset}.{formats_by_name[file_type]['extension']}",
+                                  sum(counts.values()), shard_size)
+            filepath = os.path.join(output_dir, filename)
+
+            try:
+                if not catalog_only:
+                    if shard_size:
+                        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+                    with phase_timer(metrics, "write"), open(filepath, 'wb') as out:
+                        out.write(data)
+
+                if catalog:
+                    with phase_timer(metrics, "hash"):
+                        file_digests = hash_bytes(data, digests)
+                    catalog.write(filename, file_type, start_offset, len(data), file_digests)
+
+                counts[file_type] += 1
+                if metrics:
+                    metrics.add("files_carved", format=file_type)
+                    if not catalog_only:
+                        metrics.add("bytes_written", len(data), format=file_type)
+            except Exception as e:
+                print(f"Error writing {filename}: {e}")
+
+    if catalog:
+        catalog.close()
+        print(f"Catalog saved to {catalog_path}")
+
+    if metrics:
+        metrics.save(metrics_path)
+        print(f"Metrics saved to {metrics_path}")
+
+    print("\nScanning Complete.")
+    print(_summary(counts))
+    if validate:
+        print(f"Rejected {sum(rejected.values())} candidates that failed the structure check.")
+
+if __name__ == "__main__":
+    DISK_IMAGE = "test_disk.img"
+    OUTPUT_FOLDER = "recovered_files"
+
+    parser = argparse.ArgumentParser(description="Recover files (JPG and PNG by default) from a raw disk image.")
+    parser.add_argument("--image", default=DISK_IMAGE,
+                        help="Disk image to carve: raw, seekable .zst, .gz or the .001 of a split image; "
+                             "'-' reads it from stdin")
+    parser.add_argument("--output", default=OUTPUT_FOLDER, help="Directory for recovered files")
+    parser.add_argument("--workers", type=int, default=1, help="Number of processes used for the signature scan")
+    parser.add_argument("--catalog",
+                        help="Also record every carve (offset, length, type, digests) in this CSV or .jsonl file")
+    parser.add_argument("--catalog-only", action="store_true",
+                        help=f"Only record carves in the catalog (default {CATALOG_FILE}), write no files")
+    parser.add_argument("--digests", default="md5",
+                        help="Comma separated digests recorded in the catalog, e.g. md5,sha1,sha256")
+    parser.add_argument("--extract-method", default="auto", choices=["auto"] + METHODS,
+                        help="How carved bytes are copied out of the image")
+    parser.add_argument("--formats-file", action="append", default=[],
+                        help="JSON/TOML file declaring extra formats (see extra_formats.json), may be repeated")
+    parser.add_argument("--only", help="Comma separated format names to carve, e.g. JPG,PNG")
+    parser.add_argument("--no-validate", action="store_true",
+                        help="Write every header/footer pair without checking the file structure")
+    parser.add_argument("--stream", action="store_true",
+                        help="Read the image block by block instead of mapping it (implied for stdin)")
+    parser.add_argument("--block-size", type=int, default=BLOCK_SIZE, help="Block size in bytes for --stream")
+    parser.add_argument("--checkpoint",
+                        help="Journal progress to this file so an interrupted run can be resumed")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"Continue from the checkpoint (default {CHECKPOINT_FILE}) of an interrupted run")
+    parser.add_argument("--index", nargs="?", const="",
+                        help="Take signature offsets from a persistent index directory "
+                             f"(default <image>{INDEX_SUFFIX}), building it on first use")
+    parser.add_argument("--writer-threads", type=int, default=WRITER_THREADS,
+                        help="Threads writing carved files behind the scan, 0 writes them inline")
+    parser.add_argument("--shard-size", type=int,
+                        help="Spread output files over numbered subdirectories of this many files each")
+    parser.add_argument("--entropy-map", action="store_true",
+                        help="Run a per-block entropy pre-pass (needs numpy) and skip uniform blocks in the scan")
+    parser.add_argument("--heatmap",
+                        help="Save the per-block entropy map to this file (PNG heatmap, or CSV for .csv)")
+    parser.add_argument("--metrics",
+                        help="Collect per-phase and per-format metrics and save them to this file "
+                             "(Prometheus text for .prom/.txt, JSON otherwise)")
+    args = parser.parse_args()
+
+    load_entry_points()
+    for formats_file in args.formats_file:
+        load_format_file(formats_file)
+    try:
+        formats = get_formats(args.only.split(",") if args.only else None)
+    except ValueError as e:
+        parser.error(str(e))
+    digests = args.digests.split(",")
+
+    if (args.checkpoint or args.resume) and (args.image == "-" or args.stream):
+        parser.error("--checkpoint/--resume need a seekable image, not --stream or stdin")
+    if args.index is not None and (args.image == "-" or args.stream):
+        parser.error("--index needs a seekable image, not --stream or stdin")
+    if (args.entropy_map or args.heatmap) and (args.image == "-" or args.stream):
+        parser.error("--entropy-map/--heatmap need a seekable image, not --stream or stdin")
+    index_dir = None
+    if args.index is not None:
+        index_dir = args.index or args.image + INDEX_SUFFIX
+
+    if args.image == "-":
+        recover_stream(sys.stdin.buffer, args.output, catalog_path=args.catalog,
+                       catalog_only=args.catalog_only, block_size=args.block_size, name="stdin",
+                       validate=not args.no_validate, formats=formats, digests=digests,
+                       metrics_path=args.metrics, shard_size=args.shard_size)
+    elif args.stream:
+        try:
+            image = open_stream(args.image)
+        except RuntimeError as e:
+            parser.error(str(e))
+        with image:
+            recover_stream(image, args.output, catalog_path=args.catalog,
+                           catalog_only=args.catalog_only, block_size=args.block_size, name=args.image,
+                           validate=not args.no_validate, formats=formats, digests=digests,
+                           metrics_path=args.metrics, shard_size=args.shard_size)
+    else:
+        recover_files(args.image, args.output, workers=args.workers, catalog_path=args.catalog,
+                      catalog_only=args.catalog_only, extract_method=args.extract_method,
+                      validate=not args.no_validate, formats=formats, digests=digests,
+                      metrics_path=args.metrics, checkpoint_path=args.checkpoint, resume=args.resume,
+                      index_dir=index_dir, writer_threads=args.writer_threads, shard_size=args.shard_size,
+                      entropy_map=args.entropy_map, heatmap_path=args.heatmap)
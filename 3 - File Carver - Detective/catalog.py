@@ -0,0 +1,80 @@
+import csv
+import hashlib
+import json
+import os
+
+# Columns every catalog row starts with (named like the generator's ground truth CSV)
+CATALOG_FIELDS = ["filename", "file_type", "start_offset_decimal", "file_size_bytes"]
+
+
+# Bytes fed to every hasher in turn, small enough to stay in CPU cache between them
+HASH_BLOCK = 1024 * 1024  # 1MB
+
+
+def hash_bytes(data, algorithms):
+    """Returns a dict of algorithm -> hex digest of `data` (bytes, mmap slice or memoryview)."""
+    hashers = {name: hashlib.new(name) for name in algorithms}
+    with memoryview(data) as view:
+        for pos in range(0, len(view), HASH_BLOCK):
+            block = view[pos:pos + HASH_BLOCK]
+            for hasher in hashers.values():
+                hasher.update(block)
+            block.release()
+    return {name: hasher.hexdigest() for name, hasher in hashers.items()}
+
+
+class Catalog:
+    """
+    Records one row per carve: filename, type, offset, length and the digests
+    computed at carve time. Written as CSV, or as JSON lines if the path ends
+    in .jsonl. The validator can score a run from this file alone.
+    """
+
+    def __init__(self, path, digests=(), resume_at=None):
+        """resume_at: byte size the catalog had at a checkpoint, rows after it are dropped."""
+        self.path = path
+        self.digests = list(digests)
+        self.jsonl = path.endswith(".jsonl")
+        if resume_at is None:
+            self.file = open(path, "w", newline="", encoding="utf-8")
+        else:
+            self.file = open(path, "r+", newline="", encoding="utf-8")
+            self.file.truncate(resume_at)
+            self.file.seek(resume_at)
+        if not self.jsonl:
+            self.writer = csv.writer(self.file)
+            if resume_at is None:
+                self.writer.writerow(CATALOG_FIELDS + self.digests)
+
+    def write(self, filename, file_type, start_offset, length, digests=None):
+        digests = digests or {}
+        values = [filename, file_type, start_offset, length] + [digests.get(name, "") for name in self.digests]
+        if self.jsonl:
+            self.file.write(json.dumps(dict(zip(CATALOG_FIELDS + self.digests, values))) + "\n")
+        else:
+            self.writer.writerow(values)
+
+    def drop(self, filenames):
+        """Removes the rows of `filenames` (carves whose file could not be written) by rewriting the catalog."""
+        filenames = set(filenames)
+        self.file.flush()
+        with open(self.path, newline="", encoding="utf-8") as f:
+            if self.jsonl:
+                rows = [line for line in f if json.loads(line)["filename"] not in filenames]
+            else:
+                rows = [row for row in csv.reader(f) if row[0] not in filenames]
+        self.file.seek(0)
+        self.file.truncate()
+        if self.jsonl:
+            self.file.writelines(rows)
+        else:
+            self.writer.writerows(rows)
+
+    def sync(self):
+        """Flushes the catalog to disk and returns its size in bytes."""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
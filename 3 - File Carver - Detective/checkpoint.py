@@ -0,0 +1,149 @@
+import json
+import os
+import time
+
+from containers import segment_stats
+
+# Default checkpoint path used by --resume
+CHECKPOINT_FILE = "carve_checkpoint.json"
+
+# Minimum seconds between two checkpoints
+CHECKPOINT_INTERVAL = 30
+
+# Bump when the checkpoint layout changes, older checkpoints are then refused
+CHECKPOINT_VERSION = 2
+
+
+def run_key(disk_image_path, formats, settings):
+    """
+    Identifies a carving run: the image (size and mtime, of every segment
+    of a split image) plus everything that changes what is carved. A
+    checkpoint only resumes a run with the same key.
+    """
+    stat = os.stat(disk_image_path)
+    key = {
+        "image_size": stat.st_size,
+        "image_mtime_ns": stat.st_mtime_ns,
+        "formats": [
+            [fmt["name"], fmt["header"].hex(), fmt["footer"].hex(), fmt["footer_tail"],
+             fmt["max_size"], bool(fmt["check"])]
+            for fmt in formats
+        ],
+        **settings,
+    }
+    segments = segment_stats(disk_image_path)
+    if segments:
+        key["segments"] = segments
+    return key
+
+
+def _write_atomic(path, data):
+    """Writes data to path so that a crash leaves either the old or the new file."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class Checkpoint:
+    """
+    Journal of one recover_files run, so an interrupted run can resume.
+
+    Two files are kept:
+    - path: a small JSON state (scan cursor, next paired candidate, counts,
+      catalog size) that is atomically replaced at most every `interval` seconds.
+    - path + ".signatures": an append-only JSON lines journal with the header
+      and footer offsets of every scanned chunk, i.e. the open candidates.
+      The state records how much of it is durable, a torn tail is cut off.
+
+    The catalog, cut back to its checkpointed size, is the manifest of files
+    already emitted. Files written after the last checkpoint are simply
+    written again on resume under the same name, so no carve is duplicated.
+    """
+
+    def __init__(self, path, key, interval=CHECKPOINT_INTERVAL):
+        self.path = path
+        self.signatures_path = path + ".signatures"
+        self.key = key
+        self.interval = interval
+        self.state = {
+            "version": CHECKPOINT_VERSION,
+            "key": key,
+            "scanned": 0,
+            "signatures_size": 0,
+            "next_candidate": 0,
+            "cursor": 0,
+            "counts": {},
+            "rejected": 0,
+            "catalog_size": None,
+        }
+        self.saved_at = time.monotonic()
+        self.signatures = None
+
+    def load(self):
+        """
+        Loads an existing checkpoint for this run. Returns (headers, footers)
+        collected so far, or None if there is no checkpoint to resume.
+        Raises ValueError if the checkpoint belongs to another run.
+        """
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("version") != CHECKPOINT_VERSION or state.get("key") != self.key:
+            raise ValueError(f"Checkpoint {self.path} was written for another image or other settings")
+        self.state = state
+
+        headers = []
+        footers = {}
+        if not state["signatures_size"] and not os.path.exists(self.signatures_path):
+            # Nothing was journaled, e.g. the signatures came from an index
+            return headers, footers
+        with open(self.signatures_path, "r+b") as f:
+            # Anything past the recorded size was written after the last checkpoint
+            f.truncate(state["signatures_size"])
+            for line in f:
+                chunk = json.loads(line)
+                headers.extend((offset, name) for offset, name in chunk["headers"])
+                for name, offsets in chunk["footers"].items():
+                    footers.setdefault(name, []).extend(offsets)
+        return headers, footers
+
+    def open_signatures(self):
+        mode = "ab" if self.state["signatures_size"] else "wb"
+        self.signatures = open(self.signatures_path, mode)
+
+    def add_chunk(self, scanned, headers, footers):
+        """Journals the signatures of one scanned chunk, scanned is the new scan cursor."""
+        chunk = {"headers": headers, "footers": footers}
+        self.signatures.write(json.dumps(chunk).encode() + b"\n")
+        self.state["scanned"] = scanned
+
+    def due(self):
+        return time.monotonic() - self.saved_at >= self.interval
+
+    def save(self, catalog=None, **state):
+        """Makes the journal durable and atomically replaces the state file."""
+        if self.signatures:
+            self.signatures.flush()
+            os.fsync(self.signatures.fileno())
+            self.state["signatures_size"] = self.signatures.tell()
+        if catalog:
+            self.state["catalog_size"] = catalog.sync()
+        self.state.update(state)
+        _write_atomic(self.path, json.dumps(self.state))
+        self.saved_at = time.monotonic()
+
+    def close_signatures(self):
+        if self.signatures:
+            self.signatures.close()
+            self.signatures = None
+
+    def remove(self):
+        """Deletes the checkpoint once the run has completed."""
+        self.close_signatures()
+        for path in (self.path, self.signatures_path):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,320 @@
+import gzip
+import os
+import re
+import struct
+import threading
+import zlib
+from bisect import bisect_right
+from collections import OrderedDict
+
+try:
+    import zstandard
+except ImportError:  # only needed for .zst evidence
+    zstandard = None
+
+# Decompressed bytes kept in the block cache
+CACHE_SIZE = 256 * 1024 * 1024  # 256MB
+
+# Block size used for split raw images (they need no decompression, blocks only bound the reads)
+RAW_BLOCK_SIZE = 4 * 1024 * 1024  # 4MB
+
+# Gzip has no built-in index: one pass snapshots the decompressor about this often
+GZIP_CHECKPOINT_SPACING = 32 * 1024 * 1024  # 32MB
+GZIP_READ_SIZE = 1024 * 1024
+
+# Seekable zstd (zstd contrib/seekable_format) seek table footer
+SEEKABLE_MAGIC = 0x8F92EAB1
+SKIPPABLE_MAGIC = 0x184D2A5E
+SEEK_TABLE_FOOTER = 9
+
+# First segment of a split raw image: disk.img.001, disk.001, ...
+SEGMENT_NAME = re.compile(r"^(.*\.)(0*1)$")
+
+
+class BlockReader:
+    """
+    Random access to an evidence container through decompressed blocks.
+
+    Subclasses set self.offsets (uncompressed start of every block, plus the
+    total size as the last entry) and implement _load(index). read() stitches
+    blocks together and keeps the most recently used ones in an LRU cache of
+    CACHE_SIZE bytes, so pairing, structure checks and extraction around one
+    offset decompress each block once. Reads are thread safe.
+    """
+
+    method = "container"
+
+    def __init__(self, cache_size=CACHE_SIZE):
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.cached_bytes = 0
+        self.lock = threading.Lock()
+        self.offsets = [0]
+
+    def __len__(self):
+        return self.offsets[-1]
+
+    def _load(self, index):
+        raise NotImplementedError
+
+    def _block(self, index):
+        block = self.cache.get(index)
+        if block is not None:
+            self.cache.move_to_end(index)
+            return block
+        block = self._load(index)
+        self.cache[index] = block
+        self.cached_bytes += len(block)
+        while self.cached_bytes > self.cache_size and len(self.cache) > 1:
+            _, evicted = self.cache.popitem(last=False)
+            self.cached_bytes -= len(evicted)
+        return block
+
+    def read(self, start, end):
+        """Returns the uncompressed bytes [start, end), truncated at the end of the image."""
+        end = min(end, len(self))
+        if start >= end:
+            return b""
+        parts = []
+        with self.lock:
+            index = bisect_right(self.offsets, start) - 1
+            pos = start
+            while pos < end:
+                block = self._block(index)
+                block_start = self.offsets[index]
+                parts.append(block[pos - block_start:min(end, self.offsets[index + 1]) - block_start])
+                pos = self.offsets[index + 1]
+                index += 1
+        return parts[0] if len(parts) == 1 else b"".join(parts)
+
+    def extract(self, start_offset, end_offset, filepath):
+        """Writes image[start_offset:end_offset] to filepath (same interface as extract.Extractor)."""
+        data = self.read(start_offset, end_offset)
+        with open(filepath, "wb") as out:
+            return out.write(data)
+
+    def close(self):
+        pass
+
+
+class SeekableZstdReader(BlockReader):
+    """Seekable zstd: every frame decompresses on its own, the seek table at the end locates them."""
+
+    def __init__(self, path, cache_size=CACHE_SIZE):
+        super().__init__(cache_size)
+        if zstandard is None:
+            raise RuntimeError("Reading .zst images needs the zstandard package (pip install zstandard)")
+        self.file = open(path, "rb")
+        self.decompressor = zstandard.ZstdDecompressor()
+
+        file_size = os.fstat(self.file.fileno()).st_size
+        magic = None
+        if file_size >= SEEK_TABLE_FOOTER:
+            self.file.seek(file_size - SEEK_TABLE_FOOTER)
+            frames, descriptor, magic = struct.unpack("<IBI", self.file.read(SEEK_TABLE_FOOTER))
+        if magic != SEEKABLE_MAGIC:
+            raise ValueError(f"{path} is not seekable zstd (no seek table), carve it with --stream")
+        entry_size = 12 if descriptor & 0x80 else 8
+        table_size = frames * entry_size + SEEK_TABLE_FOOTER
+        self.file.seek(file_size - table_size)
+        table = self.file.read(frames * entry_size)
+
+        self.frames = []  # compressed offset and size of every frame
+        compressed = 0
+        for i in range(frames):
+            compressed_size, size = struct.unpack_from("<II", table, i * entry_size)
+            self.frames.append((compressed, compressed_size))
+            compressed += compressed_size
+            self.offsets.append(self.offsets[-1] + size)
+
+    def _load(self, index):
+        offset, compressed_size = self.frames[index]
+        self.file.seek(offset)
+        size = self.offsets[index + 1] - self.offsets[index]
+        return self.decompressor.decompress(self.file.read(compressed_size), max_output_size=size)
+
+    def close(self):
+        self.file.close()
+
+
+class IndexedGzipReader(BlockReader):
+    """
+    Gzip with a random access index, built in one decompression pass.
+
+    Every GZIP_CHECKPOINT_SPACING bytes of output (and at every member start)
+    a copy of the zlib decompressor is kept with its input offset, so a block
+    is re-inflated from the nearest checkpoint instead of from the start. The
+    snapshots hold zlib's 32KB window, so the index costs about 1/1000 of the
+    image in memory.
+    """
+
+    def __init__(self, path, cache_size=CACHE_SIZE):
+        super().__init__(cache_size)
+        self.file = open(path, "rb")
+        self.checkpoints = []  # (input offset, decompressor ready to read from it)
+        print(f"Indexing {path}...")
+
+        self.offsets = []
+        decompressor = None
+        input_offset = 0
+        output_size = 0
+        since_checkpoint = 0
+        while True:
+            data = self.file.read(GZIP_READ_SIZE)
+            if not data:
+                break
+            while data:
+                if decompressor is None:
+                    if not data.strip(b"\x00"):
+                        # Zero padding after the last member
+                        input_offset += len(data)
+                        break
+                    # A member starts here (concatenated gzip, e.g. bgzip, has many)
+                    decompressor = zlib.decompressobj(wbits=31)
+                    self.checkpoints.append((input_offset, decompressor.copy()))
+                    self.offsets.append(output_size)
+                    since_checkpoint = 0
+                out = decompressor.decompress(data)
+                output_size += len(out)
+                since_checkpoint += len(out)
+                if decompressor.eof:
+                    rest = decompressor.unused_data
+                    input_offset += len(data) - len(rest)
+                    data = rest
+                    decompressor = None
+                else:
+                    input_offset += len(data)
+                    data = b""
+            if decompressor is not None and since_checkpoint >= GZIP_CHECKPOINT_SPACING:
+                # All input so far is consumed, so the copy resumes exactly at input_offset
+                self.checkpoints.append((input_offset, decompressor.copy()))
+                self.offsets.append(output_size)
+                since_checkpoint = 0
+        self.offsets.append(output_size)
+
+    def _load(self, index):
+        input_offset, snapshot = self.checkpoints[index]
+        decompressor = snapshot.copy()
+        size = self.offsets[index + 1] - self.offsets[index]
+        self.file.seek(input_offset)
+        parts = []
+        produced = 0
+        while produced < size:
+            data = decompressor.unconsumed_tail or self.file.read(GZIP_READ_SIZE)
+            if not data:
+                break
+            out = decompressor.decompress(data, size - produced)
+            parts.append(out)
+            produced += len(out)
+            if decompressor.eof:
+                break
+        return b"".join(parts)
+
+    def close(self):
+        self.file.close()
+
+
+class SegmentedRawReader(BlockReader):
+    """A raw image split into numbered segments (disk.img.001, .002, ...) read as one."""
+
+    def __init__(self, paths, cache_size=CACHE_SIZE):
+        super().__init__(cache_size)
+        self.files = [open(path, "rb") for path in paths]
+        self.segment_starts = [0]
+        for f in self.files:
+            self.segment_starts.append(self.segment_starts[-1] + os.fstat(f.fileno()).st_size)
+        total = self.segment_starts[-1]
+        self.offsets = list(range(0, total, RAW_BLOCK_SIZE)) + [total]
+
+    def _load(self, index):
+        start, end = self.offsets[index], self.offsets[index + 1]
+        parts = []
+        pos = start
+        while pos < end:
+            segment = bisect_right(self.segment_starts, pos) - 1
+            f = self.files[segment]
+            f.seek(pos - self.segment_starts[segment])
+            part = f.read(min(end, self.segment_starts[segment + 1]) - pos)
+            if not part:
+                break
+            parts.append(part)
+            pos += len(part)
+        return b"".join(parts)
+
+    def close(self):
+        for f in self.files:
+            f.close()
+
+
+def segment_paths(path):
+    """Returns every segment of a split raw image given its first one (.001), or None."""
+    match = SEGMENT_NAME.match(path)
+    if not match:
+        return None
+    prefix, first = match.groups()
+    paths = []
+    number = int(first)
+    while True:
+        candidate = f"{prefix}{number:0{len(first)}d}"
+        if not os.path.exists(candidate):
+            return paths
+        paths.append(candidate)
+        number += 1
+
+
+def segment_stats(path):
+    """
+    Returns [size, mtime_ns] of every segment of a split raw image, or None
+    for any other image, so a change to a later segment is noticed too.
+    """
+    paths = segment_paths(path)
+    if not paths:
+        return None
+    return [[stat.st_size, stat.st_mtime_ns] for stat in map(os.stat, paths)]
+
+
+def open_container(path):
+    """
+    Returns a BlockReader for compressed or split evidence (.zst/.zstd, .gz,
+    .001 segments), or None for a plain raw image, which is memory mapped instead.
+    """
+    lower = path.lower()
+    if lower.endswith((".zst", ".zstd")):
+        return SeekableZstdReader(path)
+    if lower.endswith(".gz"):
+        return IndexedGzipReader(path)
+    segments = segment_paths(path)
+    if segments:
+        return SegmentedRawReader(segments)
+    return None
+
+
+def open_stream(path):
+    """Opens any supported container as a plain sequential stream of image bytes (for --stream)."""
+    lower = path.lower()
+    if lower.endswith((".zst", ".zstd")):
+        if zstandard is None:
+            raise RuntimeError("Reading .zst images needs the zstandard package (pip install zstandard)")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), read_across_frames=True,
+                                                          closefd=True)
+    if lower.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def check_window(reader, check, start, stop, end_hint):
+    """
+    Runs a structure check on a container without reading all of
+    [start, stop): the check first sees the bytes up to the paired footer
+    (end_hint) plus some slack, and the full range only if that is not enough.
+    Returns the check's result as an image offset (or None / TRUNCATED).
+    """
+    window_end = min(stop, max(end_hint, start + 65536) + 65536)
+    while True:
+        window = reader.read(start, window_end)
+        result = check(window, 0, len(window))
+        if result is not None and result >= 0:
+            return start + result
+        if result is None or window_end >= stop:
+            return result
+        window_end = stop
@@ -0,0 +1,182 @@
+import csv
+import struct
+import zlib
+
+from containers import BlockReader
+
+try:
+    import numpy as np
+except ImportError:  # the pre-pass needs numpy, plain carving does not
+    np = None
+
+# Bytes per block of the region map (a common file system cluster size)
+ENTROPY_BLOCK_SIZE = 4096
+
+# Bytes analysed per numpy batch, a multiple of the block size. The per-block
+# histograms of a batch take up to 4 bytes per image byte of temporary memory.
+ENTROPY_BATCH_SIZE = 4 * 1024 * 1024  # 4MB
+
+# Blocks per row of the heatmap image
+HEATMAP_WIDTH = 256
+
+
+class EntropyMap:
+    """
+    Per-block statistics of an image from one vectorized pass: Shannon
+    entropy (bits per byte), the number of distinct byte values, and whether
+    the block is a single repeated byte (zero fill, 0xFF wipes...).
+
+    A uniform block cannot contain a signature unless the signature is made
+    of that one byte value, so ranges() leaves such blocks out of the
+    signature scan. Nothing else is skipped: compressed file content and
+    random noise look alike here (both close to 8 bits per byte), so the
+    entropy is reported (see save()) but never used to drop candidates.
+    """
+
+    def __init__(self, file_size, block_size=ENTROPY_BLOCK_SIZE):
+        if np is None:
+            raise RuntimeError("The entropy pre-pass needs numpy (pip install numpy)")
+        self.block_size = block_size
+        self.file_size = file_size
+        count = -(-file_size // block_size)
+        self.entropy = np.zeros(count, dtype=np.float32)
+        self.distinct = np.zeros(count, dtype=np.uint16)
+        self.first_byte = np.zeros(count, dtype=np.uint8)
+        self.skip = {}  # patterns -> skippable blocks, see skippable()
+
+    def compute(self, image):
+        """
+        Fills the map from image (the read-only mmap of a raw image, or a
+        container's BlockReader). Yields the bytes analysed per batch, for a progress bar.
+        """
+        batch_size = max(self.block_size, ENTROPY_BATCH_SIZE - ENTROPY_BATCH_SIZE % self.block_size)
+        for batch_start in range(0, self.file_size, batch_size):
+            batch_end = min(batch_start + batch_size, self.file_size)
+            if isinstance(image, BlockReader):
+                data = np.frombuffer(image.read(batch_start, batch_end), dtype=np.uint8)
+            else:
+                data = np.frombuffer(image, dtype=np.uint8, count=batch_end - batch_start, offset=batch_start)
+            self._add_batch(batch_start // self.block_size, data)
+            del data  # a view into the mapping must not outlive it
+            yield batch_end - batch_start
+
+    def _add_batch(self, first_block, data):
+        block_size = self.block_size
+        full = len(data) // block_size
+        rows = [data[:full * block_size].reshape(full, block_size)] if full else []
+        if len(data) % block_size:
+            # The last block of the image may be short
+            rows.append(data[full * block_size:].reshape(1, -1))
+        for row_block, blocks in zip((first_block, first_block + full), rows):
+            n, length = blocks.shape
+            end = row_block + n
+            self.first_byte[row_block:end] = blocks[:, 0]
+            # Uniform blocks are settled by one comparison (entropy 0, one distinct
+            # byte), histograms are only built for the others
+            uniform = (blocks == blocks[:, :1]).all(axis=1)
+            self.distinct[row_block:end] = 1
+            mixed = np.flatnonzero(~uniform)
+            if not len(mixed):
+                continue
+            mixed_blocks = blocks[mixed]
+            # One bincount for every block: block i counts its bytes in bins [256*i, 256*i + 256)
+            bins = (np.arange(len(mixed), dtype=np.int32) * 256)[:, None] + mixed_blocks
+            counts = np.bincount(bins.ravel(), minlength=len(mixed) * 256).reshape(len(mixed), 256)
+            p = counts / length
+            with np.errstate(divide="ignore", invalid="ignore"):
+                entropy = -np.where(counts > 0, p * np.log2(p), 0.0).sum(axis=1)
+            self.entropy[row_block + mixed] = entropy
+            self.distinct[row_block + mixed] = (counts > 0).sum(axis=1)
+
+    def skippable(self, patterns):
+        """
+        Returns a bool array of the blocks the scan can leave out: uniform
+        blocks whose byte is not the only byte of any of `patterns`.
+        """
+        key = tuple(patterns)
+        if key not in self.skip:
+            skip = self.distinct == 1
+            for pattern in patterns:
+                if len(set(pattern)) == 1:
+                    skip &= self.first_byte != pattern[0]
+            self.skip[key] = skip
+        return self.skip[key]
+
+    def ranges(self, start, end, scanner):
+        """
+        Returns the sorted (start, end) ranges of [start, end) to scan with
+        `scanner`. Every signature starting in [start, end) starts inside one.
+
+        Kept blocks are scanned whole. A signature can also start in the last
+        max_len - 1 bytes of a skipped block and end in the next one, when
+        that block is kept or a uniform block of another byte value, so those
+        bytes are scanned too. This only depends on the blocks around each
+        offset, so the ranges of adjacent [start, end) pieces never overlap
+        or leave a gap, wherever the pieces are cut.
+        """
+        block_size = self.block_size
+        lookback = scanner.max_len - 1
+        skip = self.skippable(scanner.patterns)
+        first = start // block_size
+        last = -(-end // block_size)
+        keep = ~skip[first:last]
+        if keep.all():
+            return [(start, end)]
+
+        # Runs of kept blocks, as [run start, run end) block indexes
+        edges = np.flatnonzero(np.diff(np.concatenate(([False], keep, [False])).astype(np.int8)))
+        intervals = list(zip(((edges[::2] + first) * block_size).tolist(),
+                             ((edges[1::2] + first) * block_size).tolist()))
+
+        # Block boundaries whose lookback bytes reach into [start, end)
+        if lookback:
+            boundaries = np.arange(first + 1, min(len(skip), (end + lookback - 1) // block_size + 1))
+            before, after = boundaries - 1, boundaries
+            crossing = skip[before] & (~skip[after] | (self.first_byte[before] != self.first_byte[after]))
+            for boundary in (boundaries[crossing] * block_size).tolist():
+                intervals.append((boundary - lookback, boundary))
+            intervals.sort()
+
+        ranges = []
+        for range_start, range_end in intervals:
+            range_start, range_end = max(start, range_start), min(end, range_end)
+            if ranges and range_start <= ranges[-1][1]:
+                ranges[-1] = (ranges[-1][0], max(ranges[-1][1], range_end))
+            elif range_start < range_end:
+                ranges.append((range_start, range_end))
+        return ranges
+
+    def skipped_bytes(self, scanner, start=0):
+        """Returns how many bytes of the image from `start` on ranges() leaves out."""
+        scanned = sum(end - begin for begin, end in self.ranges(start, self.file_size, scanner))
+        return self.file_size - start - scanned
+
+    def save(self, path):
+        """
+        Writes the map to path: one CSV row per block for .csv, otherwise a
+        grayscale PNG heatmap, HEATMAP_WIDTH blocks per row in image order,
+        from black (uniform, 0 bits per byte) to white (8 bits per byte).
+        """
+        if path.endswith(".csv"):
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(["offset_decimal", "entropy_bits", "distinct_bytes", "uniform"])
+                for index, (entropy, distinct) in enumerate(zip(self.entropy.tolist(), self.distinct.tolist())):
+                    writer.writerow([index * self.block_size, f"{entropy:.4f}", distinct, int(distinct == 1)])
+            return
+
+        height = -(-len(self.entropy) // HEATMAP_WIDTH)
+        pixels = np.zeros(height * HEATMAP_WIDTH, dtype=np.uint8)
+        pixels[:len(self.entropy)] = np.round(self.entropy / 8 * 255).astype(np.uint8)
+        rows = pixels.reshape(height, HEATMAP_WIDTH)
+        # Filter type 0 (None) in front of every scanline
+        raw = np.hstack([np.zeros((height, 1), dtype=np.uint8), rows]).tobytes()
+
+        def chunk(kind, data):
+            return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+        with open(path, "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n")
+            f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", HEATMAP_WIDTH, height, 8, 0, 0, 0, 0)))
+            f.write(chunk(b"IDAT", zlib.compress(raw, 9)))
+            f.write(chunk(b"IEND", b""))
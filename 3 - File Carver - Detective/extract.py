@@ -0,0 +1,83 @@
+import errno
+import os
+
+# Errors meaning "this copy call is not supported here" (old kernel, other
+# platform, cross-filesystem copy...). They switch the extractor to the next
+# method instead of failing the file.
+_UNSUPPORTED = {errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP}
+
+METHODS = ["copy_file_range", "sendfile", "mmap"]
+
+
+def available_methods():
+    """Returns the extraction methods this platform offers, fastest first."""
+    methods = []
+    if hasattr(os, "copy_file_range"):
+        methods.append("copy_file_range")
+    if hasattr(os, "sendfile"):
+        methods.append("sendfile")
+    methods.append("mmap")
+    return methods
+
+
+class Extractor:
+    """
+    Copies byte ranges of the disk image into output files without building a
+    bytes object for each carved file.
+
+    copy_file_range and sendfile move the data inside the kernel, straight from
+    the image file descriptor to the output file. The mmap method writes a
+    memoryview slice of the mapping, which is still copy-free in user space.
+    The first method that fails as unsupported is dropped for the rest of the run.
+    extract() may be called from several threads at once (see writer.py).
+    """
+
+    def __init__(self, src_file, mm, method="auto"):
+        self.src_fd = src_file.fileno()
+        self.mm = mm
+        self.size = len(mm)
+        if method == "auto":
+            self.methods = available_methods()
+        else:
+            self.methods = [method]
+
+    @property
+    def method(self):
+        return self.methods[0]
+
+    def extract(self, start_offset, end_offset, filepath):
+        """Writes image[start_offset:end_offset] to filepath and returns the number of bytes written."""
+        # Like slicing, a range running past the end of the image is truncated
+        end_offset = min(end_offset, self.size)
+        with open(filepath, "wb") as out:
+            while True:
+                method = self.method
+                try:
+                    return self._copy(method, start_offset, end_offset, out)
+                except OSError as e:
+                    if e.errno not in _UNSUPPORTED or len(self.methods) == 1:
+                        raise
+                    # Fall back to the next method and start this file over
+                    # (another thread may have dropped this method already)
+                    if self.methods[0] == method:
+                        self.methods.pop(0)
+                    out.seek(0)
+                    out.truncate()
+
+    def _copy(self, method, start_offset, end_offset, out):
+        if method == "mmap":
+            with memoryview(self.mm) as view:
+                return out.write(view[start_offset:end_offset])
+
+        out_fd = out.fileno()
+        offset = start_offset
+        while offset < end_offset:
+            count = end_offset - offset
+            if method == "copy_file_range":
+                copied = os.copy_file_range(self.src_fd, out_fd, count, offset_src=offset)
+            else:
+                copied = os.sendfile(out_fd, self.src_fd, offset, count)
+            if copied == 0:
+                break
+            offset += copied
+        return offset - start_offset
@@ -0,0 +1,125 @@
+import importlib
+import json
+from importlib.metadata import entry_points
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+from structure import check_jpeg, check_png
+
+# Entry point group other packages can use to contribute formats
+ENTRY_POINT_GROUP = "file_carver.formats"
+
+# Structure checks that format files can refer to by name
+CHECKS = {"jpeg": check_jpeg, "png": check_png}
+
+# Registered formats by name, in registration order
+REGISTRY = {}
+
+
+def register_format(name, header, footer, footer_tail=None, max_size=None, check=None, extension=None):
+    """
+    Adds a format to the registry (replacing any format with the same name).
+
+    header/footer: signature bytes.
+    footer_tail:   bytes from the start of the footer match to the end of the
+                   file, defaults to the footer length.
+    max_size:      largest file accepted, None means the carver's MAX_FILE_SIZE.
+    check:         optional structure check, check(buf, start, stop) -> end offset,
+                   None or TRUNCATED (see structure.py).
+    extension:     extension of recovered files, defaults to the lowercase name.
+    """
+    if not header or not footer:
+        raise ValueError(f"Format {name} needs a header and a footer signature")
+    fmt = {
+        "name": name,
+        "header": bytes(header),
+        "footer": bytes(footer),
+        "footer_tail": len(footer) if footer_tail is None else footer_tail,
+        "max_size": max_size,
+        "check": check,
+        "extension": extension or name.lower(),
+    }
+    REGISTRY[name] = fmt
+    return fmt
+
+
+def get_formats(names=None):
+    """Returns the registered formats, optionally only those in `names`."""
+    if names is None:
+        return list(REGISTRY.values())
+    missing = [name for name in names if name not in REGISTRY]
+    if missing:
+        raise ValueError(f"Unknown format(s): {', '.join(missing)}. Known: {', '.join(REGISTRY)}")
+    return [REGISTRY[name] for name in names]
+
+
+def _resolve_check(ref):
+    """A check is either the name of a built-in check or a 'module:function' reference."""
+    if not ref:
+        return None
+    if ref in CHECKS:
+        return CHECKS[ref]
+    module_name, _, attr = ref.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def load_format_file(path):
+    """
+    Registers the formats declared in a JSON or TOML file.
+
+    The file holds a "formats" list. Signatures are hex strings, e.g.
+
+        {"formats": [{"name": "GIF", "header": "47 49 46 38", "footer": "00 3B"}]}
+
+    Returns the registered descriptors.
+    """
+    if path.endswith(".toml"):
+        if tomllib is None:
+            raise RuntimeError("TOML format files need Python 3.11+ (tomllib)")
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+    loaded = []
+    for entry in data.get("formats", []):
+        loaded.append(register_format(
+            entry["name"],
+            bytes.fromhex(entry["header"]),
+            bytes.fromhex(entry["footer"]),
+            footer_tail=entry.get("footer_tail"),
+            max_size=entry.get("max_size"),
+            check=_resolve_check(entry.get("check")),
+            extension=entry.get("extension"),
+        ))
+    return loaded
+
+
+def load_entry_points(group=ENTRY_POINT_GROUP):
+    """
+    Registers formats contributed by installed packages.
+
+    Each entry point refers to a dict of register_format() arguments, a list
+    of them, or a callable returning either.
+    """
+    loaded = []
+    for entry_point in entry_points(group=group):
+        declared = entry_point.load()
+        if callable(declared):
+            declared = declared()
+        if isinstance(declared, dict):
+            declared = [declared]
+        for entry in declared:
+            loaded.append(register_format(**entry))
+    return loaded
+
+
+# Built-in formats
+# JPEG: Start FF D8, End FF D9
+register_format("JPG", b'\xFF\xD8', b'\xFF\xD9', footer_tail=2, check=check_jpeg)
+# PNG: Start 89 50 4E 47 0D 0A 1A 0A, End IEND (plus 4 bytes CRC)
+register_format("PNG", b'\x89\x50\x4E\x47\x0D\x0A\x1A\x0A', b'IEND', footer_tail=8, check=check_png)
@@ -0,0 +1,85 @@
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+# Metric descriptions, also used as Prometheus HELP lines
+METRICS = {
+    "bytes_scanned": "Bytes of the image scanned for signatures",
+    "bytes_skipped": "Bytes of uniform blocks the entropy pre-pass left out of the scan",
+    "header_hits": "Header signatures found",
+    "footer_hits": "Footer signatures found",
+    "footer_searches": "Footer lookups for a header candidate outside already carved files",
+    "rejected": "Header candidates rejected",
+    "files_carved": "Files carved",
+    "bytes_written": "Bytes of carved files written",
+    "write_errors": "Carved files that could not be written",
+    "phase_seconds": "Time spent per carving phase",
+}
+
+# Prefix of every exported metric name
+PREFIX = "carver_"
+
+
+class CarveMetrics:
+    """
+    Counters and phase timers for one carving run.
+
+    Counters are keyed by metric name plus labels (format, rejection reason),
+    timers accumulate wall time per phase: entropy (optional pre-pass), scan
+    (signature search), pair (header/footer pairing), validate (structure
+    checks), write (extraction) and hash (catalog digests).
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.started = time.perf_counter()
+
+    def add(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self.values[key] = self.values.get(key, 0) + value
+
+    @contextmanager
+    def timer(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add("phase_seconds", time.perf_counter() - start, phase=phase)
+
+    def to_dict(self):
+        """Returns {metric: [{"labels": {...}, "value": n}, ...]} plus the total run time."""
+        result = {"run_seconds": time.perf_counter() - self.started}
+        for (name, labels), value in sorted(self.values.items()):
+            result.setdefault(name, []).append({"labels": dict(labels), "value": value})
+        return result
+
+    def to_prometheus(self):
+        """Returns the metrics in the Prometheus text exposition format."""
+        lines = []
+        names = sorted({name for name, _ in self.values})
+        for name in names:
+            metric = PREFIX + name + ("" if name == "phase_seconds" else "_total")
+            kind = "gauge" if name == "phase_seconds" else "counter"
+            lines.append(f"# HELP {metric} {METRICS.get(name, name)}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for (key_name, labels), value in sorted(self.values.items()):
+                if key_name != name:
+                    continue
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+                lines.append(f"{metric}{{{label_text}}} {value}" if label_text else f"{metric} {value}")
+        lines.append(f"# TYPE {PREFIX}run_seconds gauge")
+        lines.append(f"{PREFIX}run_seconds {time.perf_counter() - self.started}")
+        return "\n".join(lines) + "\n"
+
+    def save(self, path):
+        """Writes the metrics to path: Prometheus text for .prom/.txt, JSON otherwise."""
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith((".prom", ".txt")):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.to_dict(), f, indent=2)
+
+
+def phase_timer(metrics, phase):
+    """metrics.timer(phase), or a no-op context when metrics are off (metrics is None)."""
+    return metrics.timer(phase) if metrics else nullcontext()
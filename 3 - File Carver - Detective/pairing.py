@@ -0,0 +1,85 @@
+from bisect import bisect_left
+
+try:
+    import numpy as np
+except ImportError:  # pairing falls back to one bisect per header
+    np = None
+
+# Rejection reasons decided by pairing alone (the structure check comes later)
+NO_FOOTER = "no_footer"
+TOO_LARGE = "too_large"
+
+
+def pair_candidates(headers, footers, formats, max_file_size):
+    """
+    Pairs every header with the nearest footer of its format that starts after
+    the header signature and drops pairs larger than the format's max_size
+    (max_file_size if unset).
+
+    headers is the sorted (offset, format_name) list of a scan, footers the
+    sorted footer offsets per format. Returns (starts, ends, names, rejected):
+    three lists of the surviving candidates in header order, with ends
+    including the footer tail, and a dict of (format_name, reason) -> count.
+
+    With numpy the lookups of a format are one searchsorted call over all its
+    headers, so millions of spurious headers in noise cost a few array
+    operations. Overlaps are not resolved here: which candidate wins depends
+    on the structure check, so recover_files does that while walking the list.
+    """
+    if np is None:
+        return _pair_python(headers, footers, formats, max_file_size)
+    if not headers:
+        return [], [], [], {}
+
+    names = [fmt["name"] for fmt in formats]
+    ids = {name: i for i, name in enumerate(names)}
+    starts = np.fromiter((offset for offset, _ in headers), dtype=np.int64, count=len(headers))
+    kinds = np.fromiter((ids[name] for _, name in headers), dtype=np.int32, count=len(headers))
+    ends = np.full(len(headers), -1, dtype=np.int64)
+    rejected = {}
+
+    for kind, fmt in enumerate(formats):
+        mask = kinds == kind
+        if not mask.any():
+            continue
+        format_starts = starts[mask]
+        format_footers = np.asarray(footers.get(fmt["name"], []), dtype=np.int64)
+        max_size = fmt["max_size"] or max_file_size
+
+        # Index of the first footer at or after the end of each header signature
+        i = np.searchsorted(format_footers, format_starts + len(fmt["header"]))
+        found = i < len(format_footers)
+        format_ends = np.full(len(format_starts), -1, dtype=np.int64)
+        format_ends[found] = format_footers[i[found]] + fmt["footer_tail"]
+
+        too_large = found & (format_ends - format_starts > max_size)
+        format_ends[too_large] = -1
+        ends[mask] = format_ends
+        rejected[(fmt["name"], NO_FOOTER)] = int(np.count_nonzero(~found))
+        rejected[(fmt["name"], TOO_LARGE)] = int(np.count_nonzero(too_large))
+
+    keep = ends >= 0
+    return (starts[keep].tolist(), ends[keep].tolist(),
+            [names[kind] for kind in kinds[keep].tolist()], rejected)
+
+
+def _pair_python(headers, footers, formats, max_file_size):
+    """pair_candidates without numpy, with the same results."""
+    formats_by_name = {fmt["name"]: fmt for fmt in formats}
+    starts, ends, names = [], [], []
+    rejected = {}
+    for start_offset, name in headers:
+        fmt = formats_by_name[name]
+        format_footers = footers.get(name, [])
+        i = bisect_left(format_footers, start_offset + len(fmt["header"]))
+        if i == len(format_footers):
+            rejected[(name, NO_FOOTER)] = rejected.get((name, NO_FOOTER), 0) + 1
+            continue
+        end_offset = format_footers[i] + fmt["footer_tail"]
+        if end_offset - start_offset > (fmt["max_size"] or max_file_size):
+            rejected[(name, TOO_LARGE)] = rejected.get((name, TOO_LARGE), 0) + 1
+            continue
+        starts.append(start_offset)
+        ends.append(end_offset)
+        names.append(name)
+    return starts, ends, names, rejected
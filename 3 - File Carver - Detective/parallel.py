@@ -0,0 +1,60 @@
+import mmap
+from multiprocessing import Pool
+
+from scanner import SignatureScanner, collect_signatures
+
+# Scanner built once per worker process by _init_worker
+_scanner = None
+
+
+def _init_worker(formats):
+    global _scanner
+    _scanner = SignatureScanner(formats)
+
+
+def _scan_range(task):
+    """
+    Maps one byte range of the image and collects the signatures that start
+    inside it, or only inside its sub-ranges if the task lists any.
+    """
+    disk_image_path, file_size, start, end, ranges = task
+
+    # mmap offsets must be aligned to the allocation granularity, so the
+    # mapping may begin a little before `start`.
+    map_start = start - (start % mmap.ALLOCATIONGRANULARITY)
+    # Overlap into the next range so a signature straddling `end` can still match.
+    map_end = min(file_size, end + _scanner.max_len - 1)
+
+    with open(disk_image_path, "rb") as f:
+        with mmap.mmap(f.fileno(), map_end - map_start, access=mmap.ACCESS_READ,
+                       offset=map_start) as mm:
+            headers = []
+            footers = {}
+            for range_start, range_end in [(start, end)] if ranges is None else ranges:
+                range_headers, range_footers = collect_signatures(
+                    _scanner, mm, range_start - map_start, range_end - map_start, base=map_start
+                )
+                headers.extend(range_headers)
+                for name, offsets in range_footers.items():
+                    footers.setdefault(name, []).extend(offsets)
+    return end - start, headers, footers
+
+
+def parallel_scan(disk_image_path, file_size, formats, workers, chunk_size, start=0, regions=None):
+    """
+    Splits the image into byte ranges and scans them in a pool of worker processes.
+
+    Yields (bytes_scanned, headers, footers) per range, in image order, so the
+    caller can merge them into the same sorted lists a single-process scan builds.
+    Scanning begins at `start` (0, or a chunk boundary when resuming). With
+    regions (an entropy.EntropyMap) the blocks it can skip are not scanned.
+    """
+    scanner = SignatureScanner(formats) if regions else None
+    tasks = []
+    for chunk_start in range(start, file_size, chunk_size):
+        chunk_end = min(chunk_start + chunk_size, file_size)
+        ranges = regions.ranges(chunk_start, chunk_end, scanner) if regions else None
+        tasks.append((disk_image_path, file_size, chunk_start, chunk_end, ranges))
+    with Pool(workers, initializer=_init_worker, initargs=(formats,)) as pool:
+        for result in pool.imap(_scan_range, tasks):
+            yield result
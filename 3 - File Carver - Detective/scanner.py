@@ -0,0 +1,144 @@
+import re
+
+try:
+    import numpy as np
+except ImportError:  # without numpy every scan uses the regex alternation
+    np = None
+
+HEADER = "header"
+FOOTER = "footer"
+
+# Bytes checked per prefilter batch (about 2 bytes of temporary arrays per byte)
+PREFILTER_BATCH_SIZE = 1024 * 1024  # 1MB
+
+
+class SignatureScanner:
+    """
+    Finds every header and footer signature of a set of formats in one
+    linear pass over a buffer (bytes, bytearray, mmap, memoryview).
+
+    With numpy, the first two bytes at every offset are looked up in a
+    65536-entry table of signature prefixes (one lookup per byte however
+    many formats are loaded), and only the offsets that hit are compared
+    against the signatures sharing that prefix. Without numpy all
+    signatures are compiled into a single regex alternation, which slows
+    down as formats are added.
+    """
+
+    def __init__(self, formats):
+        # Map each distinct byte pattern to the (role, format name) pairs it stands for.
+        # The same pattern may be a header for one format and a footer for another.
+        # A descriptor without a footer (as used to index single patterns) only adds its header.
+        self.roles = {}
+        for fmt in formats:
+            for role in (HEADER, FOOTER):
+                pattern = fmt.get(role)
+                if pattern:
+                    self.roles.setdefault(pattern, []).append((role, fmt["name"]))
+
+        # Longest patterns first so the alternation prefers the most specific match.
+        # Events at the same offset are reported in this order.
+        patterns = sorted(self.roles, key=len, reverse=True)
+        self.patterns = patterns
+        self.max_len = len(patterns[0])
+        self.regex = re.compile(b"|".join(re.escape(p) for p in patterns))
+
+        # A match only reports one pattern per offset. Shorter patterns that are
+        # a prefix of the matched one start at the same offset and must be emitted too.
+        self.prefixes = {
+            p: [q for q in patterns if q != p and p.startswith(q)] for p in patterns
+        }
+
+        # Prefilter: patterns by their first two bytes (1-byte patterns by that byte),
+        # longest first, and lookup tables marking those prefixes
+        self.by_pair = {}
+        self.by_byte = {}
+        for p in patterns:
+            if len(p) > 1:
+                self.by_pair.setdefault(p[:2], []).append(p)
+            else:
+                self.by_byte.setdefault(p, []).append(p)
+        if np is not None:
+            self.pair_table = np.zeros(65536, dtype=bool)
+            self.pair_table[[(p[0] << 8) | p[1] for p in self.by_pair]] = True
+            self.byte_table = np.zeros(256, dtype=bool)
+            self.byte_table[[p[0] for p in self.by_byte]] = True
+
+    def scan(self, buf, start=0, end=None):
+        """
+        Yields (offset, role, format_name) events, sorted by offset, for every
+        signature that starts inside buf[start:end].
+
+        Matches may extend past `end` so that a chunked caller can scan
+        adjacent ranges without losing signatures that straddle the boundary.
+        """
+        if end is None:
+            end = len(buf)
+        # Allow a match that starts before `end` to finish past it.
+        endpos = min(len(buf), end + self.max_len - 1)
+        if np is not None:
+            yield from self._scan_prefiltered(buf, start, end, endpos)
+            return
+
+        search = self.regex.search
+        pos = start
+        while pos < end:
+            match = search(buf, pos, endpos)
+            if match is None:
+                break
+            offset = match.start()
+            if offset >= end:
+                break
+            pattern = match.group()
+            for role, name in self.roles[pattern]:
+                yield (offset, role, name)
+            for shorter in self.prefixes[pattern]:
+                for role, name in self.roles[shorter]:
+                    yield (offset, role, name)
+            # Restart one byte later (not after the match) so overlapping signatures are seen.
+            pos = offset + 1
+
+    def _scan_prefiltered(self, buf, start, end, endpos):
+        """scan() with the prefix tables, batch by batch. Events come in the regex scan's order."""
+        end = min(end, endpos)
+        for pos in range(start, end, PREFILTER_BATCH_SIZE):
+            stop = min(end, pos + PREFILTER_BATCH_SIZE)
+            count = stop - pos
+            # One byte past the batch, for the window of its last offset
+            available = min(endpos, stop + 1) - pos
+            hits = np.zeros(count, dtype=bool)
+            # The windows at even and odd offsets, read as big-endian 16-bit words
+            for first in (0, 1):
+                words = min((available - first) // 2, (count - first + 1) // 2)
+                if words > 0:
+                    pairs = np.frombuffer(buf, dtype=">u2", count=words, offset=pos + first)
+                    hits[first:first + 2 * words:2] = self.pair_table[pairs]
+                    del pairs  # a view into the buffer must not outlive it
+            if self.by_byte:
+                data = np.frombuffer(buf, dtype=np.uint8, count=count, offset=pos)
+                hits |= self.byte_table[data]
+                del data
+
+            for offset in (np.flatnonzero(hits) + pos).tolist():
+                window = bytes(buf[offset:min(offset + self.max_len, endpos)])
+                for pattern in self.by_pair.get(window[:2], []) + self.by_byte.get(window[:1], []):
+                    if window.startswith(pattern):
+                        for role, name in self.roles[pattern]:
+                            yield (offset, role, name)
+
+
+def collect_signatures(scanner, buf, start=0, end=None, base=0):
+    """
+    Scans buf[start:end] and splits the events into a sorted header list of
+    (offset, format_name) and a dict of sorted footer offsets per format.
+
+    `base` is added to every offset, for buffers that map only part of an image.
+    """
+    headers = []
+    footers = {}
+    for offset, role, name in scanner.scan(buf, start, end):
+        if role == HEADER:
+            headers.append((base + offset, name))
+        else:
+            footers.setdefault(name, []).append(base + offset)
+    return headers, footers
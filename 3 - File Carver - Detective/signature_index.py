@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+
+from containers import segment_stats
+from scanner import HEADER
+
+try:
+    import numpy as np
+except ImportError:  # the index needs numpy, plain carving does not
+    np = None
+
+# Default index directory, next to the image
+INDEX_SUFFIX = ".sigindex"
+
+# Manifest inside the index directory
+MANIFEST_NAME = "index.json"
+
+# The image fingerprint hashes this many evenly spread blocks instead of
+# every byte, so checking the index of a 1 TB image takes milliseconds
+SAMPLE_BLOCKS = 64
+SAMPLE_SIZE = 64 * 1024  # 64KB
+
+
+def image_fingerprint(disk_image_path):
+    """
+    Returns the size, mtime and a SHA-256 of sampled blocks of the image,
+    plus the size and mtime of every segment of a split image.
+    """
+    stat = os.stat(disk_image_path)
+    size = stat.st_size
+    sha = hashlib.sha256()
+    with open(disk_image_path, "rb") as f:
+        step = max(SAMPLE_SIZE, size // SAMPLE_BLOCKS)
+        for offset in range(0, size, step):
+            f.seek(offset)
+            sha.update(f.read(SAMPLE_SIZE))
+    fingerprint = {"size": size, "mtime_ns": stat.st_mtime_ns, "sample_sha256": sha.hexdigest()}
+    segments = segment_stats(disk_image_path)
+    if segments:
+        fingerprint["segments"] = segments
+    return fingerprint
+
+
+class SignatureIndex:
+    """
+    On-disk index of every offset at which a signature occurs in one image.
+
+    Each signature (byte pattern) gets a sorted uint64 .npy array in the index
+    directory; index.json records the image fingerprint and which pattern is
+    in which file. An index whose fingerprint no longer matches the image is
+    discarded. Patterns are indexed on first use, so a later run with other
+    formats only scans for the signatures that are new.
+    """
+
+    def __init__(self, directory, disk_image_path):
+        if np is None:
+            raise RuntimeError("The signature index needs numpy (pip install numpy)")
+        self.directory = directory
+        self.fingerprint = image_fingerprint(disk_image_path)
+        self.files = {}  # pattern hex -> .npy file name
+
+        manifest_path = os.path.join(directory, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("image") == self.fingerprint:
+                self.files = manifest["signatures"]
+            else:
+                print(f"Index {directory} belongs to another version of the image, rebuilding it.")
+        os.makedirs(directory, exist_ok=True)
+
+    def missing(self, patterns):
+        """Returns the patterns that are not indexed yet."""
+        return [pattern for pattern in patterns if pattern.hex() not in self.files]
+
+    def add(self, offsets_by_pattern):
+        """Stores the sorted offsets of newly scanned patterns and updates the manifest."""
+        for pattern, offsets in offsets_by_pattern.items():
+            filename = pattern.hex() + ".npy"
+            np.save(os.path.join(self.directory, filename), np.asarray(offsets, dtype=np.uint64))
+            self.files[pattern.hex()] = filename
+
+        # Written last (and atomically), so a crash never leaves a manifest naming missing arrays
+        manifest_path = os.path.join(self.directory, MANIFEST_NAME)
+        with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"image": self.fingerprint, "signatures": self.files}, f, indent=2)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+    def offsets(self, pattern):
+        """Returns the sorted uint64 offsets of an indexed pattern (memory mapped)."""
+        return np.load(os.path.join(self.directory, self.files[pattern.hex()]), mmap_mode="r")
+
+    def signatures(self, scanner):
+        """
+        Rebuilds what a full scan with `scanner` collects, from the index alone:
+        a header list of (offset, format_name) sorted by offset (same-offset
+        events in the scanner's order) and a dict of sorted footer offsets per format.
+        """
+        header_offsets = []
+        header_ranks = []
+        names = []
+        footers = {}
+        for pattern in scanner.patterns:
+            offsets = self.offsets(pattern)
+            for role, name in scanner.roles[pattern]:
+                if role == HEADER:
+                    header_offsets.append(offsets)
+                    header_ranks.append(np.full(len(offsets), len(names), dtype=np.uint32))
+                    names.append(name)
+                else:
+                    footers[name] = offsets.tolist()
+
+        if not names:
+            return [], footers
+        offsets = np.concatenate(header_offsets)
+        ranks = np.concatenate(header_ranks)
+        order = np.lexsort((ranks, offsets))
+        headers = list(zip(offsets[order].tolist(), [names[rank] for rank in ranks[order].tolist()]))
+        return headers, footers
@@ -0,0 +1,146 @@
+from collections import deque
+
+from scanner import SignatureScanner, HEADER
+from structure import TRUNCATED
+from metrics import phase_timer
+
+# Bytes read from the input per block
+BLOCK_SIZE = 4 * 1024 * 1024  # 4MB
+
+
+def carve_stream(stream, formats, max_file_size, block_size=BLOCK_SIZE, validate=True, metrics=None,
+                 rejected=None):
+    """
+    Carves files from a non-seekable input (stdin, a pipe, any object with read()).
+
+    The input is read in fixed-size blocks. Only the bytes that may still be
+    part of a carve are kept: from the earliest header that is not decided yet
+    to the end of the data read so far. A header is decided once its footer is
+    in the buffer or once no footer could fit within the format's max_size
+    (max_file_size if unset), so the buffer never holds much more than the
+    largest max size + block_size bytes.
+
+    With validate=True a format's structure check must also pass; a header
+    whose structure is still intact at the end of the buffer waits for more data.
+
+    Yields (start_offset, format_name, data) in image order, with the same
+    pairing rules as recover_files. `data` is a memoryview into the buffer and
+    is released when the generator resumes, so write it out before moving on.
+
+    metrics is an optional CarveMetrics that receives the scan and pairing
+    counters; writing and hashing are the caller's to count. rejected is an
+    optional dict counting the candidates that fail the structure check per format.
+    """
+    scanner = SignatureScanner(formats)
+    formats_by_name = {fmt["name"]: fmt for fmt in formats}
+    # Bytes a signature may still extend past the scanned region
+    overlap = scanner.max_len - 1
+
+    buf = bytearray()
+    base = 0      # image offset of buf[0]
+    scanned = 0   # every signature starting before this offset has been collected
+    cursor = 0    # end of the last carve, headers before it are skipped
+    headers = deque()
+    footers = {name: deque() for name in formats_by_name}
+    eof = False
+
+    while not eof:
+        block = stream.read(block_size)
+        if block:
+            buf += block
+        else:
+            eof = True
+        data_end = base + len(buf)
+
+        # A signature near the end of the buffer can only be matched once the
+        # next block is in, unless there is no next block.
+        scan_end = data_end if eof else data_end - overlap
+        if scan_end > scanned:
+            with phase_timer(metrics, "scan"):
+                for offset, role, name in scanner.scan(buf, scanned - base, scan_end - base):
+                    if role == HEADER:
+                        headers.append((base + offset, name))
+                    else:
+                        footers[name].append(base + offset)
+                    if metrics:
+                        metrics.add("header_hits" if role == HEADER else "footer_hits", format=name)
+            if metrics:
+                metrics.add("bytes_scanned", scan_end - scanned)
+            scanned = scan_end
+
+        # Decide pending headers in order, the same way recover_files walks them
+        while headers:
+            start_offset, file_type = headers[0]
+            if start_offset < cursor:
+                headers.popleft()
+                continue
+
+            fmt = formats_by_name[file_type]
+            format_footers = footers[file_type]
+            max_size = fmt["max_size"] or max_file_size
+
+            # Footers before this header cannot close it or any later one
+            min_footer = start_offset + len(fmt["header"])
+            while format_footers and format_footers[0] < min_footer:
+                format_footers.popleft()
+
+            if format_footers:
+                end_offset = format_footers[0] + fmt["footer_tail"]
+                if end_offset - start_offset > max_size:
+                    if metrics:
+                        metrics.add("footer_searches", format=file_type)
+                        metrics.add("rejected", format=file_type, reason="too_large")
+                    headers.popleft()
+                    continue
+                if end_offset > data_end and not eof:
+                    # The bytes after the footer (PNG CRC) are not read yet
+                    break
+                end_offset = min(end_offset, data_end)
+
+                if validate and fmt["check"]:
+                    limit = start_offset + max_size
+                    stop = min(limit, data_end)
+                    with phase_timer(metrics, "validate"):
+                        checked_end = fmt["check"](buf, start_offset - base, stop - base)
+                    if checked_end == TRUNCATED and not eof and stop < limit:
+                        # Structure intact so far, the rest is not read yet
+                        break
+                    if checked_end is None or checked_end == TRUNCATED:
+                        if rejected is not None:
+                            rejected[file_type] = rejected.get(file_type, 0) + 1
+                        if metrics:
+                            metrics.add("footer_searches", format=file_type)
+                            metrics.add("rejected", format=file_type, reason="structure")
+                        headers.popleft()
+                        continue
+                    end_offset = base + checked_end
+
+                if metrics:
+                    metrics.add("footer_searches", format=file_type)
+
+                data = memoryview(buf)[start_offset - base:end_offset - base]
+                yield start_offset, file_type, data
+                data.release()
+
+                cursor = end_offset
+                headers.popleft()
+            elif eof or scanned > start_offset + max_size - fmt["footer_tail"]:
+                # Any footer still to come would make the file too large
+                if metrics:
+                    metrics.add("footer_searches", format=file_type)
+                    metrics.add("rejected", format=file_type, reason="too_large" if not eof else "no_footer")
+                headers.popleft()
+            else:
+                # Need more data to decide
+                break
+
+        if not headers:
+            # Later headers start at or after `scanned`, so no collected footer can close them
+            for format_footers in footers.values():
+                format_footers.clear()
+
+        # Drop bytes that no pending or future carve can need
+        keep_from = headers[0][0] if headers else scanned
+        if keep_from > base:
+            del buf[:keep_from - base]
+            base = keep_from
@@ -0,0 +1,122 @@
+import zlib
+
+# Returned when the structure is still consistent but runs past `stop`,
+# i.e. the file is larger than the bytes available to check it.
+TRUNCATED = -1
+
+PNG_SIGNATURE = b'\x89\x50\x4E\x47\x0D\x0A\x1A\x0A'
+
+# JPEG markers that stand alone (no length field): TEM and RST0-RST7
+JPEG_STANDALONE = {0x01} | set(range(0xD0, 0xD8))
+# Start Of Frame markers (C4 = DHT, C8 = JPG extension, CC = DAC are not frames)
+JPEG_SOF = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _be16(buf, pos):
+    return (buf[pos] << 8) | buf[pos + 1]
+
+
+def _be32(buf, pos):
+    return (buf[pos] << 24) | (buf[pos + 1] << 16) | (buf[pos + 2] << 8) | buf[pos + 3]
+
+
+def check_jpeg(buf, start, stop):
+    """
+    Walks the JPEG marker segments from the SOI at buf[start].
+
+    Length-prefixed segments (APPn, DQT, DHT, SOF...) are skipped by their
+    length, so an FF D9 inside them (e.g. an EXIF thumbnail) does not end the
+    file. After each SOS the entropy-coded data is skipped up to the next real
+    marker. Returns the offset just past the EOI, None if the bytes are not a
+    JPEG, or TRUNCATED if the structure is valid up to `stop`.
+    """
+    if buf[start:start + 2] != b'\xFF\xD8':
+        return None
+
+    pos = start + 2
+    seen_sof = False
+    seen_sos = False
+    while True:
+        if pos + 2 > stop:
+            return TRUNCATED
+        if buf[pos] != 0xFF:
+            return None
+        marker = buf[pos + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            pos += 1
+            continue
+
+        if marker == 0xD9:
+            # EOI, only meaningful once image data was seen
+            return pos + 2 if seen_sos else None
+        if marker in JPEG_STANDALONE:
+            pos += 2
+            continue
+        if marker < 0xC0 or marker == 0xD8:
+            return None
+
+        if pos + 4 > stop:
+            return TRUNCATED
+        length = _be16(buf, pos + 2)
+        if length < 2:
+            return None
+        pos += 2 + length
+
+        if marker in JPEG_SOF:
+            seen_sof = True
+        elif marker == 0xDA:
+            if not seen_sof:
+                return None
+            seen_sos = True
+            # Entropy-coded data: FF is only a marker when not followed by
+            # a stuffed 00, an RST marker or another fill byte.
+            while True:
+                pos = buf.find(b'\xFF', pos, stop)
+                if pos == -1 or pos + 1 >= stop:
+                    return TRUNCATED
+                following = buf[pos + 1]
+                if following == 0x00 or 0xD0 <= following <= 0xD7:
+                    pos += 2
+                elif following == 0xFF:
+                    pos += 1
+                else:
+                    break
+
+
+def check_png(buf, start, stop):
+    """
+    Walks the PNG chunk chain from the signature at buf[start].
+
+    The first chunk must be IHDR, every chunk type must be ASCII letters and
+    every CRC must match. Returns the offset just past the IEND chunk's CRC,
+    None if the bytes are not a PNG, or TRUNCATED if the chain is valid up to
+    `stop`.
+    """
+    if buf[start:start + 8] != PNG_SIGNATURE:
+        return None
+
+    pos = start + 8
+    first = True
+    with memoryview(buf) as view:
+        while True:
+            if pos + 8 > stop:
+                return TRUNCATED
+            length = _be32(buf, pos)
+            chunk_type = bytes(view[pos + 4:pos + 8])
+            if length > 0x7FFFFFFF or not chunk_type.isalpha():
+                return None
+            if first and (chunk_type != b'IHDR' or length != 13):
+                return None
+            first = False
+
+            chunk_end = pos + 12 + length
+            if chunk_end > stop:
+                return TRUNCATED
+            crc = zlib.crc32(view[pos + 4:pos + 8 + length])
+            if crc != _be32(buf, pos + 8 + length):
+                return None
+
+            if chunk_type == b'IEND':
+                return chunk_end
+            pos = chunk_end
@@ -0,0 +1,105 @@
+import os
+import queue
+import threading
+from contextlib import suppress
+
+# Threads copying carved files out of the image
+WRITER_THREADS = 4
+
+# Extraction jobs that may wait for a writer before the carving loop blocks
+WRITE_QUEUE_SIZE = 64
+
+
+def shard_name(filename, carved, shard_size):
+    """
+    Returns the output name of the `carved`-th file (counting from 0): the plain
+    filename, or "<shard>/filename" with shard_size files per subdirectory.
+    """
+    if not shard_size:
+        return filename
+    return f"{carved // shard_size:05d}/{filename}"
+
+
+class WriteBehind:
+    """
+    Runs extractor.extract() calls on a pool of writer threads, so the carving
+    loop does not wait for every open()/write()/close() on the output disk.
+
+    The job queue is bounded: once `queue_size` jobs are waiting, submit()
+    blocks until a writer catches up, which keeps memory flat and the loop no
+    more than a queue ahead of the disk. Copies run in the kernel (or from the
+    shared mapping), so the threads do not fight over the GIL. With
+    threads=0 every job runs inline in submit().
+
+    A job that fails leaves no partial file behind and is reported by
+    failures(), so the caller can take it back out of its counts and catalog.
+    An inline job reports its failure from submit() instead.
+    """
+
+    def __init__(self, extractor, threads=WRITER_THREADS, queue_size=WRITE_QUEUE_SIZE):
+        self.extractor = extractor
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.failed = []  # tags of the jobs that failed, see failures()
+        self.created_dirs = set()
+        self.lock = threading.Lock()
+        self.threads = [threading.Thread(target=self._run, daemon=True) for _ in range(threads)]
+        for thread in self.threads:
+            thread.start()
+
+    def _write(self, start_offset, end_offset, filepath, tag, record=True):
+        try:
+            self.extractor.extract(start_offset, end_offset, filepath)
+        except Exception as e:
+            print(f"Error writing {os.path.basename(filepath)}: {e}")
+            with suppress(OSError):
+                os.remove(filepath)
+            if record:
+                with self.lock:
+                    self.failed.append(filepath if tag is None else tag)
+            return False
+        return True
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                if job is None:
+                    return
+                self._write(*job)
+            finally:
+                self.jobs.task_done()
+
+    def submit(self, start_offset, end_offset, filepath, tag=None):
+        """
+        Queues image[start_offset:end_offset] to be written to filepath,
+        blocking while the queue is full. failures() reports a failed job by
+        its tag (default: filepath). Returns False if the job ran inline
+        (threads=0) and failed; failures() does not report it again.
+        """
+        directory = os.path.dirname(filepath)
+        if directory and directory not in self.created_dirs:
+            # Shard directories are created here, in order, not racing in the writers
+            os.makedirs(directory, exist_ok=True)
+            self.created_dirs.add(directory)
+        if not self.threads:
+            return self._write(start_offset, end_offset, filepath, tag, record=False)
+        self.jobs.put((start_offset, end_offset, filepath, tag))
+        return True
+
+    def drain(self):
+        """Waits until every queued file is written (before a checkpoint records them as done)."""
+        self.jobs.join()
+
+    def failures(self):
+        """Returns the tags of the jobs that failed since the last call (complete after drain())."""
+        with self.lock:
+            failed, self.failed = self.failed, []
+        return failed
+
+    def close(self):
+        """Writes the remaining jobs and stops the threads. Returns the failures not collected yet."""
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join()
+        return self.failures()
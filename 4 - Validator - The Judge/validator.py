@@ -1,137 +1,465 @@
-
-import csv
-import hashlib
-import os
-import sys
-import shutil
-
-def calculate_md5(filepath):
-    """Calculates the MD5 hash of a file."""
-    hash_md5 = hashlib.md5()
-    try:
-        with open(filepath, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
-    except Exception as e:
-        print(f"Error reading file {filepath}: {e}")
-        return None
-
-def load_ground_truth(csv_path):
-    """Loads ground truth data into a dictionary of hash -> filename."""
-    ground_truth = {}
-    if not os.path.exists(csv_path):
-        print(f"Error: {csv_path} not found.")
-        sys.exit(1)
-    
-    with open(csv_path, 'r', newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            # Clean up keys just in case of whitespace
-            row = {k.strip(): v.strip() for k, v in row.items()}
-            if 'md5_hash' in row and 'filename' in row:
-                ground_truth[row['md5_hash']] = row['filename']
-    return ground_truth
-
-def main():
-    ground_truth_file = "ground_truth.csv"
-    recovered_dir = "recovered_files"
-    verified_dir = os.path.join(recovered_dir, "verified_evidence")
-    false_positives_dir = os.path.join(recovered_dir, "false_positives")
-    report_file = "results_report.txt"
-
-    print("--- Digital Forensic Validator ---")
-
-    # 1. Load Ground Truth
-    print(f"Loading Ground Truth from {ground_truth_file}...")
-    ground_truth_map = load_ground_truth(ground_truth_file)
-    total_original_files = len(ground_truth_map)
-    print(f"Loaded {total_original_files} hashes from Ground Truth.")
-
-    # Prepare tracking
-    true_positives = 0
-    false_positives = 0
-    missing_hashes = set(ground_truth_map.keys())
-
-    # 2. Setup Output Directories
-    if not os.path.exists(recovered_dir):
-        print(f"Error: Directory {recovered_dir} not found.")
-        sys.exit(1)
-    
-    os.makedirs(verified_dir, exist_ok=True)
-    os.makedirs(false_positives_dir, exist_ok=True)
-    print(f"Sorting files into:\n  - {verified_dir}\n  - {false_positives_dir}")
-
-    # 3. Iterate Recovered Files
-    # List files only, exclude the directories we just created
-    recovered_files_list = [f for f in os.listdir(recovered_dir) 
-                            if os.path.isfile(os.path.join(recovered_dir, f))]
-    
-    total_recovered_files = len(recovered_files_list)
-    print(f"Found {total_recovered_files} files to validate...")
-
-    for filename in recovered_files_list:
-        filepath = os.path.join(recovered_dir, filename)
-        file_hash = calculate_md5(filepath)
-
-        if file_hash:
-            if file_hash in ground_truth_map:
-                true_positives += 1
-                if file_hash in missing_hashes:
-                    missing_hashes.remove(file_hash)
-                # Move to Verified
-                try:
-                    shutil.move(filepath, os.path.join(verified_dir, filename))
-                except Exception as e:
-                    print(f"Error moving {filename} to Verified: {e}")
-            else:
-                false_positives += 1
-                # Move to False Positives
-                try:
-                    shutil.move(filepath, os.path.join(false_positives_dir, filename))
-                except Exception as e:
-                    print(f"Error moving {filename} to False Positives: {e}")
-
-    # 4. Calculate Stats
-    false_negatives = len(missing_hashes)
-    
-    if total_recovered_files > 0:
-        precision = (true_positives / total_recovered_files) * 100
-    else:
-        precision = 0.0
-
-    if total_original_files > 0:
-        recall = (true_positives / total_original_files) * 100
-    else:
-        recall = 0.0
-
-    # 5. Generate Report
-    report_lines = []
-    report_lines.append("--- Thesis Experiment Report ---")
-    report_lines.append(f"Total Original Files (Ground Truth): {total_original_files}")
-    report_lines.append(f"Total Recovered Files (Processed): {total_recovered_files}")
-    report_lines.append("-" * 30)
-    report_lines.append(f"True Positives (Verified Evidence): {true_positives}")
-    report_lines.append(f"False Positives (Garbage/Noise): {false_positives}")
-    report_lines.append(f"False Negatives (Missed Files): {false_negatives}")
-    report_lines.append("-" * 30)
-    report_lines.append(f"Precision Score: {precision:.2f}%")
-    report_lines.append(f"Recall Score: {recall:.2f}%")
-    report_lines.append("-" * 30)
-    report_lines.append("File Organization:")
-    report_lines.append(f" - Verified Evidence: {verified_dir}")
-    report_lines.append(f" - False Positives: {false_positives_dir}")
-    
-    report_content = "\n".join(report_lines)
-    
-    print("\n" + report_content)
-
-    try:
-        with open(report_file, "w", encoding="utf-8") as f:
-            f.write(report_content)
-        print(f"\nReport saved to {report_file}")
-    except Exception as e:
-        print(f"Error saving report: {e}")
-
-if __name__ == "__main__":
-    main()
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
+
+# Read size for hashing. Large reads keep the per-call overhead low and let
+# hashlib release the GIL, so hashing threads run in parallel.
+READ_SIZE = 1024 * 1024  # 1MB
+
+# Ways to apply a verdict to a recovered file
+VERDICT_MODES = ["rename", "hardlink", "manifest"]
+
+# Default verdict manifest for the "manifest" mode
+MANIFEST_FILE = "validation_manifest.csv"
+
+# How a carve lines up with the ground truth file it overlaps most
+OFFSET_CLASSES = ["exact", "truncated", "over-extended", "spurious"]
+
+# Carver output names carry the start offset, e.g. recovered_92660.jpg
+RECOVERED_NAME = re.compile(r"recovered_(\d+)\.")
+
+def calculate_digests(filepath, algorithms=("md5",)):
+    """
+    Calculates several digests of a file in a single read.
+    Returns a dict of algorithm -> hex digest, or None if the file cannot be read.
+    """
+    hashers = {name: hashlib.new(name) for name in algorithms}
+    try:
+        with open(filepath, "rb") as f:
+            if len(hashers) == 1 and hasattr(hashlib, "file_digest"):
+                # Single digest: let hashlib drive the read loop (Python 3.11+)
+                name, = hashers
+                return {name: hashlib.file_digest(f, name).hexdigest()}
+            buffer = bytearray(READ_SIZE)
+            view = memoryview(buffer)
+            while True:
+                n = f.readinto(buffer)
+                if not n:
+                    break
+                for hasher in hashers.values():
+                    hasher.update(view[:n])
+        return {name: hasher.hexdigest() for name, hasher in hashers.items()}
+    except Exception as e:
+        print(f"Error reading file {filepath}: {e}")
+        return None
+
+def calculate_md5(filepath):
+    """Calculates the MD5 hash of a file."""
+    digests = calculate_digests(filepath)
+    return digests["md5"] if digests else None
+
+def apply_verdict(filepath, target_dir, mode, filename=None):
+    """
+    Files a recovered file under target_dir, as `filename` (its path relative
+    to the recovered directory, which keeps the carver's shard subdirectory).
+    rename moves it (same filesystem, no data copied), hardlink leaves the
+    original in place and links it into target_dir, manifest touches nothing.
+    """
+    if mode == "manifest":
+        return
+    target = os.path.join(target_dir, filename or os.path.basename(filepath))
+    if os.path.dirname(target) != target_dir:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+    if mode == "hardlink":
+        os.link(filepath, target)
+    else:
+        os.rename(filepath, target)
+
+def list_recovered(recovered_dir, skip_dirs=()):
+    """
+    Lists the recovered files as paths relative to recovered_dir, including
+    those in shard subdirectories (carver --shard-size), skipping skip_dirs.
+    """
+    files = []
+    for root, dirs, names in os.walk(recovered_dir):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) not in skip_dirs)
+        rel_root = os.path.relpath(root, recovered_dir)
+        for name in names:
+            files.append(name if rel_root == "." else os.path.join(rel_root, name))
+    return files
+
+def _hash_and_place(filepath, digests):
+    """Hashes a recovered file and reads its start offset (from the name) and length."""
+    match = RECOVERED_NAME.match(os.path.basename(filepath))
+    start = int(match.group(1)) if match else None
+    try:
+        length = os.path.getsize(filepath)
+    except OSError:
+        length = 0
+    return calculate_digests(filepath, digests), start, length
+
+def load_ground_truth(csv_path):
+    """Loads ground truth data into a dictionary of hash -> filename."""
+    ground_truth = {}
+    if not os.path.exists(csv_path):
+        print(f"Error: {csv_path} not found.")
+        sys.exit(1)
+    
+    with open(csv_path, 'r', newline='', encoding='utf-8') as csvfile:
+        reader = csv.DictReader(csvfile)
+        for row in reader:
+            # Clean up keys just in case of whitespace
+            row = {k.strip(): v.strip() for k, v in row.items()}
+            if 'md5_hash' in row and 'filename' in row:
+                ground_truth[row['md5_hash']] = row['filename']
+    return ground_truth
+
+class IntervalIndex:
+    """
+    Ground truth files as sorted [start, end) byte intervals, kept as
+    (start, end, filename, whole) tuples.
+
+    Intervals are sorted by start, and a running maximum of their ends lets
+    overlapping() bisect to the first candidate, so a lookup costs O(log n)
+    plus the number of intervals that actually overlap. An interval that is
+    not `whole` (a fragment, or the written part of a truncated file) can
+    never be carved exactly; file_count is the number of files the
+    intervals belong to.
+    """
+
+    def __init__(self, intervals, file_count=None):
+        self.intervals = sorted(intervals)
+        self.file_count = len(self.intervals) if file_count is None else file_count
+        self.starts = [start for start, _, _, _ in self.intervals]
+        self.max_ends = []
+        max_end = 0
+        for _, end, _, _ in self.intervals:
+            max_end = max(max_end, end)
+            self.max_ends.append(max_end)
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def overlapping(self, start, end):
+        """Returns the indexes of the intervals that share at least one byte with [start, end)."""
+        lo = bisect_right(self.max_ends, start)
+        hi = bisect_left(self.starts, end)
+        return [i for i in range(lo, hi) if self.intervals[i][1] > start]
+
+    def classify(self, start, end):
+        """
+        Classifies the carve [start, end) against the interval it overlaps most.
+        Returns (offset class, interval index or None, overlap start, overlap end).
+        """
+        best = None
+        best_overlap = 0
+        for i in self.overlapping(start, end):
+            gt_start, gt_end, _, _ = self.intervals[i]
+            overlap = min(end, gt_end) - max(start, gt_start)
+            if overlap > best_overlap:
+                best, best_overlap = i, overlap
+        if best is None:
+            return "spurious", None, start, start
+
+        gt_start, gt_end, _, whole = self.intervals[best]
+        if (start, end) == (gt_start, gt_end) and whole:
+            offset_class = "exact"
+        elif start <= gt_start and end >= gt_end:
+            offset_class = "over-extended"
+        else:
+            # Part of the file is missing from the carve
+            offset_class = "truncated"
+        return offset_class, best, max(start, gt_start), min(end, gt_end)
+
+def load_ground_truth_intervals(csv_path, extended_csv_path=None):
+    """
+    Loads the ground truth offsets and sizes into an IntervalIndex.
+
+    ground_truth.csv has one interval per file, from its (first) offset over
+    its full size, which is only right for files written in one piece. With
+    the generator's extended CSV every written piece is indexed instead, so
+    fragmented and truncated files are scored on the bytes actually on disk
+    (and neither can be an exact carve).
+    """
+    intervals = []
+    file_count = None
+    with open(extended_csv_path or csv_path, 'r', newline='', encoding='utf-8') as csvfile:
+        rows = [{k.strip(): v.strip() for k, v in row.items()} for row in csv.DictReader(csvfile)]
+    if extended_csv_path:
+        file_count = 0
+        for row in rows:
+            start = int(row['start_offset_decimal'])
+            whole = int(row['piece_count']) == 1 and row['scenario'] != "truncated"
+            intervals.append((start, start + int(row['piece_size_bytes']), row['filename'], whole))
+            file_count += int(row['piece_index']) == 0
+        return IntervalIndex(intervals, file_count)
+    for row in rows:
+        if 'start_offset_decimal' in row and 'file_size_bytes' in row:
+            start = int(row['start_offset_decimal'])
+            intervals.append((start, start + int(row['file_size_bytes']), row.get('filename', ''), True))
+    return IntervalIndex(intervals)
+
+def covered_bytes(overlaps):
+    """Counts the bytes covered by a list of (start, end) ranges, counting shared bytes once."""
+    total = 0
+    covered_to = None
+    for start, end in sorted(overlaps):
+        if covered_to is not None and start < covered_to:
+            start = covered_to
+        if end > start:
+            total += end - start
+            covered_to = end
+    return total
+
+def load_catalog(catalog_path):
+    """
+    Loads the carver's catalog (CSV or .jsonl) into a list of
+    (filename, digests, start offset, length), where digests holds every
+    hashlib algorithm column present in the row.
+    """
+    if not os.path.exists(catalog_path):
+        print(f"Error: {catalog_path} not found.")
+        sys.exit(1)
+
+    with open(catalog_path, 'r', newline='', encoding='utf-8') as f:
+        if catalog_path.endswith(".jsonl"):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+
+    entries = []
+    for row in rows:
+        digests = {name: str(value).strip() for name, value in row.items()
+                   if name in hashlib.algorithms_available and value}
+        if "md5" not in digests:
+            print(f"Error: {catalog_path} has no md5 digests, run the carver with --digests md5.")
+            sys.exit(1)
+        entries.append((row["filename"], digests,
+                        int(row["start_offset_decimal"]), int(row["file_size_bytes"])))
+    return entries
+
+def main(ground_truth_file="ground_truth.csv", recovered_dir="recovered_files",
+         report_file="results_report.txt", workers=None, digests=("md5",),
+         verdict_mode="rename", manifest_file=None, catalog_file=None, extended_ground_truth_file=None):
+    """
+    Validates recovered files against the ground truth.
+
+    Files are hashed in a pool of `workers` threads (default: CPU count), with
+    every algorithm in `digests` computed from the same read. MD5 is always
+    included since the ground truth is keyed on it. verdict_mode selects how
+    verdicts are applied (see apply_verdict); manifest_file, or the default
+    manifest in "manifest" mode, records every verdict with its digests.
+
+    With catalog_file (the carver's --catalog output) the digests computed at
+    carve time are scored instead, and no recovered file is opened.
+
+    Besides the hash verdicts, every carve is placed against the ground truth
+    offsets (exact, truncated, over-extended or spurious) and the report adds
+    offset recall and byte-level recall. Pass the generator's extended CSV as
+    extended_ground_truth_file to place carves against every written piece
+    (needed for images with fragmented or truncated files).
+
+    Returns the scores as a dict (percentages for precision and the recalls).
+    """
+    verified_dir = os.path.join(recovered_dir, "verified_evidence")
+    false_positives_dir = os.path.join(recovered_dir, "false_positives")
+    digests = ["md5"] + [name for name in digests if name != "md5"]
+    if verdict_mode == "manifest" and not manifest_file:
+        manifest_file = MANIFEST_FILE
+
+    print("--- Digital Forensic Validator ---")
+
+    # 1. Load Ground Truth
+    print(f"Loading Ground Truth from {ground_truth_file}...")
+    ground_truth_map = load_ground_truth(ground_truth_file)
+    total_original_files = len(ground_truth_map)
+    print(f"Loaded {total_original_files} hashes from Ground Truth.")
+    interval_index = load_ground_truth_intervals(ground_truth_file, extended_ground_truth_file)
+    print(f"Indexed {len(interval_index)} offsets of {interval_index.file_count} files from Ground Truth.")
+
+    # Prepare tracking
+    true_positives = 0
+    false_positives = 0
+    missing_hashes = set(ground_truth_map.keys())
+    offset_counts = {name: 0 for name in OFFSET_CLASSES}
+    exact_files = set()
+    overlaps = []
+    unplaced = 0
+
+    # 2. Setup Output Directories
+    if (not catalog_file or verdict_mode != "manifest") and not os.path.exists(recovered_dir):
+        print(f"Error: Directory {recovered_dir} not found.")
+        sys.exit(1)
+    
+    if verdict_mode != "manifest":
+        os.makedirs(verified_dir, exist_ok=True)
+        os.makedirs(false_positives_dir, exist_ok=True)
+        print(f"Sorting files into:\n  - {verified_dir}\n  - {false_positives_dir}")
+
+    # 3. Iterate Recovered Files
+    if catalog_file:
+        print(f"Loading carve catalog from {catalog_file}...")
+        catalog = load_catalog(catalog_file)
+        recovered_files_list = [filename for filename, _, _, _ in catalog]
+    else:
+        # List files only, exclude the directories we just created
+        recovered_files_list = list_recovered(recovered_dir, (verified_dir, false_positives_dir))
+    
+    total_recovered_files = len(recovered_files_list)
+    print(f"Found {total_recovered_files} files to validate...")
+
+    manifest = None
+    if manifest_file:
+        manifest = open(manifest_file, "w", newline="", encoding="utf-8")
+        manifest_writer = csv.writer(manifest)
+        manifest_writer.writerow(["filename", "verdict", "offset_class"] + digests)
+
+    # Hash in parallel; results come back in list order and verdicts are
+    # applied here, one file at a time.
+    filepaths = [os.path.join(recovered_dir, filename) for filename in recovered_files_list]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        if catalog_file:
+            results = ((file_digests, start, length) for _, file_digests, start, length in catalog)
+        else:
+            results = pool.map(lambda path: _hash_and_place(path, digests), filepaths)
+
+        for filename, filepath, (file_digests, start, length) in zip(recovered_files_list, filepaths, results):
+            if not file_digests:
+                continue
+            file_hash = file_digests["md5"]
+
+            # Offset verdict, independent of the hash
+            offset_class = ""
+            if start is None:
+                unplaced += 1
+            else:
+                offset_class, gt_index, overlap_start, overlap_end = interval_index.classify(start, start + length)
+                offset_counts[offset_class] += 1
+                if gt_index is not None:
+                    overlaps.append((overlap_start, overlap_end))
+                    if offset_class == "exact":
+                        exact_files.add(gt_index)
+
+            if file_hash in ground_truth_map:
+                true_positives += 1
+                if file_hash in missing_hashes:
+                    missing_hashes.remove(file_hash)
+                verdict, target_dir = "verified", verified_dir
+            else:
+                false_positives += 1
+                verdict, target_dir = "false_positive", false_positives_dir
+
+            if manifest:
+                manifest_writer.writerow([filename, verdict, offset_class]
+                                         + [file_digests.get(name, "") for name in digests])
+
+            # Move to Verified / False Positives
+            try:
+                apply_verdict(filepath, target_dir, verdict_mode, filename)
+            except Exception as e:
+                print(f"Error filing {filename} under {target_dir}: {e}")
+
+    if manifest:
+        manifest.close()
+        print(f"Verdict manifest saved to {manifest_file}")
+
+    # 4. Calculate Stats
+    false_negatives = len(missing_hashes)
+    
+    if total_recovered_files > 0:
+        precision = (true_positives / total_recovered_files) * 100
+    else:
+        precision = 0.0
+
+    if total_original_files > 0:
+        # Ground truth files found at least once; duplicate carves of one file count once
+        recall = ((total_original_files - false_negatives) / total_original_files) * 100
+    else:
+        recall = 0.0
+
+    # Offset based scores: each ground truth entry counts, duplicates included
+    # Embedded thumbnails lie inside their host, bytes shared by two entries count once
+    total_gt_bytes = covered_bytes([(start, end) for start, end, _, _ in interval_index.intervals])
+    if interval_index.file_count > 0:
+        offset_recall = (len(exact_files) / interval_index.file_count) * 100
+    else:
+        offset_recall = 0.0
+    if total_gt_bytes > 0:
+        byte_recall = (covered_bytes(overlaps) / total_gt_bytes) * 100
+    else:
+        byte_recall = 0.0
+
+    # 5. Generate Report
+    report_lines = []
+    report_lines.append("--- Thesis Experiment Report ---")
+    report_lines.append(f"Total Original Files (Ground Truth): {total_original_files}")
+    report_lines.append(f"Total Recovered Files (Processed): {total_recovered_files}")
+    report_lines.append("-" * 30)
+    report_lines.append(f"True Positives (Verified Evidence): {true_positives}")
+    report_lines.append(f"False Positives (Garbage/Noise): {false_positives}")
+    report_lines.append(f"False Negatives (Missed Files): {false_negatives}")
+    report_lines.append("-" * 30)
+    report_lines.append(f"Precision Score: {precision:.2f}%")
+    report_lines.append(f"Recall Score: {recall:.2f}%")
+    report_lines.append("-" * 30)
+    report_lines.append("Offset Analysis:")
+    report_lines.append(f" - Exact Carves: {offset_counts['exact']}")
+    report_lines.append(f" - Truncated Carves: {offset_counts['truncated']}")
+    report_lines.append(f" - Over-extended Carves: {offset_counts['over-extended']}")
+    report_lines.append(f" - Spurious Carves: {offset_counts['spurious']}")
+    if unplaced:
+        report_lines.append(f" - Unknown Offset (not a recovered_<offset> name): {unplaced}")
+    report_lines.append(f"Exact Offset Recall: {offset_recall:.2f}%")
+    report_lines.append(f"Byte-Level Recall: {byte_recall:.2f}%")
+    report_lines.append("-" * 30)
+    report_lines.append("File Organization:")
+    if verdict_mode != "manifest":
+        report_lines.append(f" - Verified Evidence: {verified_dir}")
+        report_lines.append(f" - False Positives: {false_positives_dir}")
+    if manifest_file:
+        report_lines.append(f" - Verdict Manifest: {manifest_file}")
+    
+    report_content = "\n".join(report_lines)
+    
+    print("\n" + report_content)
+
+    try:
+        with open(report_file, "w", encoding="utf-8") as f:
+            f.write(report_content)
+        print(f"\nReport saved to {report_file}")
+    except Exception as e:
+        print(f"Error saving report: {e}")
+
+    return {
+        "ground_truth_files": total_original_files,
+        "recovered_files": total_recovered_files,
+        "true_positives": true_positives,
+        "false_positives": false_positives,
+        "false_negatives": false_negatives,
+        "precision": precision,
+        "recall": recall,
+        "offset_classes": offset_counts,
+        "offset_recall": offset_recall,
+        "byte_recall": byte_recall,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score recovered files against the ground truth.")
+    parser.add_argument("--ground-truth", default="ground_truth.csv", help="Ground truth CSV from the disk generator")
+    parser.add_argument("--extended-ground-truth",
+                        help="Per-piece ground truth CSV from the disk generator, for fragmented/truncated files")
+    parser.add_argument("--recovered", default="recovered_files", help="Directory of carved files")
+    parser.add_argument("--report", default="results_report.txt", help="Where to save the report")
+    parser.add_argument("--workers", type=int, help="Hashing threads (default: CPU count)")
+    parser.add_argument("--digests", default="md5",
+                        help="Comma separated digests to compute in one read, e.g. md5,sha1,sha256")
+    parser.add_argument("--catalog",
+                        help="Score the carver's catalog (CSV/.jsonl with digests) instead of hashing recovered files")
+    parser.add_argument("--verdict-mode", choices=VERDICT_MODES,
+                        help="rename files into verdict folders, hardlink them there, or only write a manifest "
+                             "(default: rename, or manifest with --catalog)")
+    parser.add_argument("--manifest", help=f"Write every verdict and digest to this CSV (default {MANIFEST_FILE} in manifest mode)")
+    args = parser.parse_args()
+
+    verdict_mode = args.verdict_mode or ("manifest" if args.catalog else "rename")
+    main(ground_truth_file=args.ground_truth, recovered_dir=args.recovered, report_file=args.report,
+         workers=args.workers, digests=args.digests.split(","), verdict_mode=verdict_mode,
+         manifest_file=args.manifest, catalog_file=args.catalog,
+         extended_ground_truth_file=args.extended_ground_truth)
@@ -0,0 +1,269 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows, peak RSS is then not reported
+    resource = None
+
+# The pipeline stages live in sibling folders
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ("2- Disk Generator - Crime Scene", "3 - File Carver - Detective", "4 - Validator - The Judge"):
+    sys.path.insert(0, os.path.join(ROOT, folder))
+
+import generate_disk_image
+import carver
+import validator
+
+# Defaults for the benchmark matrix
+SIZES = "100M,1G"
+DENSITIES = "500"          # injected files per GB of disk
+NOISE_PROFILES = "random"
+RESULTS_FILE = "benchmark_results.json"
+BASELINE_FILE = "benchmark_baseline.json"
+WORK_DIR = "bench_work"
+
+# A run regresses if throughput drops / peak RSS grows by more than this share...
+TOLERANCE = 0.10
+# ...or precision / offset recall drop by more than this many percentage points
+ACCURACY_TOLERANCE = 0.5
+
+def read_proc_io():
+    """Returns this process's I/O counters from /proc/self/io (Linux), or an empty dict."""
+    try:
+        with open("/proc/self/io") as f:
+            counters = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return {}
+    return {name.strip(): int(value) for name, value in counters.items()}
+
+def _stage_child(fn, kwargs, log_path, conn):
+    """Runs one pipeline stage in a child process and sends back its timing, memory and I/O."""
+    with open(log_path, "w") as log:
+        # The stages print progress bars and reports, keep them out of the benchmark output
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(log.fileno(), 1)
+        os.dup2(log.fileno(), 2)
+
+        start = time.perf_counter()
+        value = fn(**kwargs)
+        seconds = time.perf_counter() - start
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+    peak_rss_kb = None
+    if resource is not None:
+        # ru_maxrss is in KB on Linux; carver worker processes count as children
+        peak_rss_kb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                          resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    io = read_proc_io()
+    conn.send({
+        "seconds": seconds,
+        "peak_rss_kb": peak_rss_kb,
+        "write_syscalls": io.get("syscw"),
+        "bytes_written": io.get("wchar"),
+        "read_syscalls": io.get("syscr"),
+        "bytes_read": io.get("rchar"),
+        "result": value,
+    })
+    conn.close()
+
+def run_stage(fn, kwargs, log_path):
+    """
+    Runs fn(**kwargs) in a fresh process so peak RSS and I/O counters belong
+    to that stage alone. Returns the metrics dict sent back by the child.
+    """
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_stage_child, args=(fn, kwargs, log_path, sender))
+    process.start()
+    sender.close()
+    try:
+        metrics = receiver.recv()
+    except EOFError:
+        metrics = None
+    process.join()
+    if metrics is None:
+        raise RuntimeError(f"Stage {fn.__name__} failed (exit code {process.exitcode}), see {log_path}")
+    return metrics
+
+def build_source(source_folder, count, dest):
+    """
+    Fills `dest` with `count` links to the images in source_folder, cycling
+    through them, so an image of any size can get any file density.
+    """
+    images = sorted(f for f in os.listdir(source_folder)
+                    if f.lower().endswith(('.jpg', '.jpeg', '.png')))
+    if not images:
+        raise RuntimeError(f"No images in {source_folder}, run the dataset downloader first")
+    shutil.rmtree(dest, ignore_errors=True)
+    os.makedirs(dest)
+    for i, filename in zip(range(count), itertools.cycle(images)):
+        target = os.path.abspath(os.path.join(source_folder, filename))
+        link = os.path.join(dest, f"copy{i:07d}_{filename}")
+        try:
+            os.symlink(target, link)
+        except OSError:
+            shutil.copyfile(target, link)
+
+def cell_key(run):
+    return (run["size_bytes"], run["density"], run["noise"])
+
+def run_cell(size, density, noise, args):
+    """Generates one image, carves and validates it, and returns the run record."""
+    name = f"{size}_{density:g}_{noise}"
+    cell_dir = os.path.join(args.workdir, name)
+    shutil.rmtree(cell_dir, ignore_errors=True)
+    os.makedirs(cell_dir)
+
+    image = os.path.join(cell_dir, "disk.img")
+    ground_truth = os.path.join(cell_dir, "ground_truth.csv")
+    extended_ground_truth = os.path.join(cell_dir, "ground_truth_extended.csv")
+    recovered = os.path.join(cell_dir, "recovered_files")
+    catalog = os.path.join(cell_dir, "carve_catalog.csv")
+    source = os.path.join(cell_dir, "source")
+
+    file_count = max(1, round(density * size / 1024 ** 3))
+    build_source(args.source, file_count, source)
+
+    generate = run_stage(generate_disk_image.generate_disk, {
+        "disk_size": size, "output_image": image, "output_csv": ground_truth,
+        "extended_csv": extended_ground_truth,
+        "source_folder": source, "seed": args.seed, "noise_profile": noise,
+    }, os.path.join(cell_dir, "generate.log"))
+
+    carve = run_stage(carver.recover_files, {
+        "disk_image_path": image, "output_dir": recovered, "workers": args.workers,
+        "catalog_path": catalog, "catalog_only": args.catalog_only,
+    }, os.path.join(cell_dir, "carve.log"))
+    carve["mb_per_s"] = size / (1024 * 1024) / carve["seconds"]
+
+    validate = run_stage(validator.main, {
+        "ground_truth_file": ground_truth, "extended_ground_truth_file": extended_ground_truth,
+        "recovered_dir": recovered,
+        "report_file": os.path.join(cell_dir, "results_report.txt"),
+        "catalog_file": catalog, "verdict_mode": "manifest",
+        "manifest_file": os.path.join(cell_dir, "validation_manifest.csv"),
+    }, os.path.join(cell_dir, "validate.log"))
+    scores = validate.pop("result")
+    for stage in (generate, carve):
+        stage.pop("result")
+
+    if not args.keep:
+        shutil.rmtree(cell_dir, ignore_errors=True)
+
+    return {
+        "size_bytes": size,
+        "density": density,
+        "noise": noise,
+        "files": file_count,
+        "generate": generate,
+        "carve": carve,
+        "validate": validate,
+        "precision": scores["precision"],
+        "recall": scores["recall"],
+        "offset_recall": scores["offset_recall"],
+        "byte_recall": scores["byte_recall"],
+    }
+
+def compare(runs, baseline, tolerance=TOLERANCE, accuracy_tolerance=ACCURACY_TOLERANCE):
+    """Returns a list of human readable regressions of `runs` against the baseline runs."""
+    baseline_runs = {cell_key(run): run for run in baseline.get("runs", [])}
+    regressions = []
+    for run in runs:
+        base = baseline_runs.get(cell_key(run))
+        if base is None:
+            continue
+        label = f"{run['size_bytes'] / 1024 ** 2:.0f} MB, {run['density']:g} files/GB, {run['noise']}"
+
+        speed, base_speed = run["carve"]["mb_per_s"], base["carve"]["mb_per_s"]
+        if speed < base_speed * (1 - tolerance):
+            regressions.append(f"{label}: carve throughput {speed:.1f} MB/s vs baseline {base_speed:.1f} MB/s")
+
+        rss, base_rss = run["carve"]["peak_rss_kb"], base["carve"]["peak_rss_kb"]
+        if rss and base_rss and rss > base_rss * (1 + tolerance):
+            regressions.append(f"{label}: carve peak RSS {rss} KB vs baseline {base_rss} KB")
+
+        # Offset recall counts every ground truth entry once, so it stays meaningful when
+        # the cell repeats source images (hash recall saturates once one copy is found)
+        for metric in ("precision", "offset_recall"):
+            if metric in base and run[metric] < base[metric] - accuracy_tolerance:
+                regressions.append(f"{label}: {metric} {run[metric]:.2f}% vs baseline {base[metric]:.2f}%")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the generate -> carve -> validate pipeline.")
+    parser.add_argument("--sizes", default=SIZES, help="Comma separated disk sizes, e.g. 100M,1G,50G")
+    parser.add_argument("--densities", default=DENSITIES, help="Comma separated file densities (files per GB)")
+    parser.add_argument("--noise", default=NOISE_PROFILES,
+                        help=f"Comma separated noise profiles ({', '.join(generate_disk_image.NOISE_PROFILES)})")
+    parser.add_argument("--source", default=generate_disk_image.DATASET_SOURCE, help="Folder with source images")
+    parser.add_argument("--workdir", default=WORK_DIR, help="Scratch folder for images and carved files")
+    parser.add_argument("--workers", type=int, default=1, help="Carver scan processes")
+    parser.add_argument("--catalog-only", action="store_true", help="Carve to the catalog only, write no files")
+    parser.add_argument("--seed", type=int, default=1, help="Generator seed, keep it fixed to compare runs")
+    parser.add_argument("--output", default=RESULTS_FILE, help="Where to write the results JSON")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="Allowed throughput drop / RSS growth as a share of the baseline")
+    parser.add_argument("--accuracy-tolerance", type=float, default=ACCURACY_TOLERANCE,
+                        help="Allowed precision/offset recall drop in percentage points")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated images and carved files")
+    args = parser.parse_args()
+
+    sizes = [generate_disk_image.parse_size(size) for size in args.sizes.split(",")]
+    densities = [float(density) for density in args.densities.split(",")]
+    profiles = args.noise.split(",")
+
+    os.makedirs(args.workdir, exist_ok=True)
+    runs = []
+    for size, density, noise in itertools.product(sizes, densities, profiles):
+        print(f"[*] {size / 1024 ** 2:.0f} MB, {density:g} files/GB, {noise} noise...")
+        run = run_cell(size, density, noise, args)
+        runs.append(run)
+        print(f"    carve {run['carve']['mb_per_s']:.1f} MB/s, peak RSS {run['carve']['peak_rss_kb']} KB, "
+              f"precision {run['precision']:.2f}%, recall {run['recall']:.2f}%, "
+              f"offset recall {run['offset_recall']:.2f}%")
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "workers": args.workers,
+        "catalog_only": args.catalog_only,
+        "seed": args.seed,
+        "runs": runs,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"[*] Results saved to {args.output}")
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(runs, baseline, args.tolerance, args.accuracy_tolerance)
+        if regressions:
+            print("[!] Regressions against the baseline:")
+            for regression in regressions:
+                print(f"    - {regression}")
+        else:
+            print(f"[+] No regressions against {args.baseline}.")
+
+    if args.save_baseline:
+        shutil.copyfile(args.output, args.baseline)
+        print(f"[*] Baseline saved to {args.baseline}")
+
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())